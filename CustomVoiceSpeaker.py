@@ -1,21 +1,31 @@
 import os
-import wave
+import sys
+import math
 import time
-import numpy as np
+import random
+import threading
 import pyaudio
 import soundfile as sf
 from scipy import signal
-import speech_recognition as sr
 import tempfile
 import shutil
-import json
 import pickle
+import argparse
+import concurrent.futures
 from tqdm import tqdm
+from audio_dsp import process_file, detect_utterances, fingerprint, is_near_duplicate
+from transcription import get_backend, BACKENDS
+from metadata_store import MetadataStore
+from recorder import Recorder
+from voice_features import analyze_file, rejection_reasons, quality_score
+from voice_index import build_index
+from audio_normalize import CANONICAL_RATE, to_canonical, convert_file
 
 class CustomVoiceTTS:
     def __init__(self, voice_samples_dir="voice_samples", 
                  voice_model_dir="voice_model",
-                 sample_rate=22050):
+                 sample_rate=CANONICAL_RATE, input_device_index=None,
+                 transcription_backend="google", transcription_language="en-US"):
         
         self.voice_samples_dir = voice_samples_dir
         self.voice_model_dir = voice_model_dir
@@ -23,132 +33,101 @@ class CustomVoiceTTS:
         self.audio_format = pyaudio.paInt16
         self.channels = 1
         self.chunk = 2048  # Increased from 1024 to 2048 to reduce overflow risk
-        self.recognizer = sr.Recognizer()
+        # New takes are transcribed with the same pluggable backends as
+        # transcribe_all; created on first use (wav2vec2 loads a model)
+        self.transcription_backend = transcription_backend
+        self.transcription_language = transcription_language
+        self._transcribe = None
+        # Devices that can't capture at sample_rate record at a common rate
+        # instead; each take is then converted once, so sample_rate never changes
+        self.recorder = Recorder(rate=sample_rate, channels=self.channels, chunk=self.chunk,
+                                 device=input_device_index)
         
         # Create directories if they don't exist
         os.makedirs(self.voice_samples_dir, exist_ok=True)
         os.makedirs(self.voice_model_dir, exist_ok=True)
         
-        # Voice metadata
-        self.voice_metadata = {
-            "sample_count": 0,
-            "total_duration": 0,
-            "phrases": [],
-            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "sample_rate": sample_rate
-        }
-        
-        # Load existing metadata if available
+        # Voice metadata: snapshot plus append-only journal, loaded if available
         self.metadata_file = os.path.join(self.voice_model_dir, "metadata.json")
-        if os.path.exists(self.metadata_file):
-            with open(self.metadata_file, "r") as f:
-                self.voice_metadata = json.load(f)
+        self.metadata = MetadataStore(self.metadata_file, sample_rate)
+    
+    @property
+    def voice_metadata(self):
+        return self.metadata.data
     
-    def record_sample(self, duration=5, prompt=None):
+    def record_sample(self, duration=5, prompt=None, countdown=3):
         """Record a voice sample for the specified duration"""
-        p = pyaudio.PyAudio()
-        
-        # Open stream with error handling
+        # The stream stays open between takes; only the first call opens it
         try:
-            stream = p.open(format=self.audio_format,
-                          channels=self.channels,
-                          rate=self.sample_rate,
-                          input=True,
-                          frames_per_buffer=self.chunk,
-                          input_overflow_callback=lambda: print("⚠️ Input overflow detected, try speaking a bit softer"))
+            self.recorder.open()
         except Exception as e:
-            print(f"Error opening audio stream: {e}")
-            print("Trying alternative audio configuration...")
-            
-            # Try with a different sample rate
-            alt_sample_rate = 16000
-            try:
-                stream = p.open(format=self.audio_format,
-                             channels=self.channels,
-                             rate=alt_sample_rate,
-                             input=True,
-                             frames_per_buffer=self.chunk * 2)
-                self.sample_rate = alt_sample_rate
-                print(f"Using alternative sample rate: {alt_sample_rate}")
-            except Exception as e2:
-                print(f"Failed to open audio stream with alternative configuration: {e2}")
-                p.terminate()
-                return None, None
+            print(f"Failed to open audio stream: {e}")
+            return None, None
         
         print("=" * 50)
         if prompt:
             print(f"Please read aloud: \"{prompt}\"")
         
         # Give the user a moment to prepare
-        print("Get ready to speak...")
-        for i in range(3, 0, -1):
-            print(f"{i}...")
-            time.sleep(1)
+        if countdown:
+            print("Get ready to speak...")
+            for i in range(countdown, 0, -1):
+                print(f"{i}...")
+                time.sleep(1)
         
         print("Recording... Speak naturally!")
         
-        frames = []
+        sample_id, filename = self.metadata.claim_sample_path(self.voice_samples_dir)
+        saved, transcription = None, None
         try:
-            for i in range(0, int(self.sample_rate / self.chunk * duration)):
-                try:
-                    data = stream.read(self.chunk, exception_on_overflow=False)
-                    frames.append(data)
-                    # Show progress
-                    progress = i / int(self.sample_rate / self.chunk * duration) * 100
-                    print(f"Recording: {progress:.1f}%", end="\r")
-                except OSError as e:
-                    print(f"\nAudio buffer overflow detected, continuing recording... {e}")
-                    # Continue recording despite overflow
-                    continue
-            
-            print("\nFinished recording!")
-        except KeyboardInterrupt:
-            print("\nRecording interrupted by user.")
+            saved, transcription = self._capture(sample_id, filename, duration, prompt)
+            return saved, transcription
+        finally:
+            # A failed, empty or interrupted take must not leave a stub WAV
+            # behind for transcription or the index build to pick up
+            if saved is None and os.path.exists(filename):
+                os.remove(filename)
+    
+    def _capture(self, sample_id, filename, duration, prompt):
+        """Record one take into filename and journal it; (None, None) on failure"""
+        try:
+            # Written to disk while recording
+            stats = self.recorder.record(filename, duration,
+                                         progress=lambda done: print(f"Recording: {done * 100:.1f}%", end="\r"))
         except Exception as e:
             print(f"\nError during recording: {e}")
-        finally:
-            # Always stop and close the stream
-            try:
-                stream.stop_stream()
-                stream.close()
-            except:
-                pass
-            p.terminate()
+            return None, None
         
-        if len(frames) == 0:
+        print("\nFinished recording!")
+        if stats.frames == 0:
             print("No audio data recorded!")
             return None, None
-            
-        # Save the audio file
-        sample_id = len(self.voice_metadata["phrases"])
-        filename = os.path.join(self.voice_samples_dir, f"sample_{sample_id:04d}.wav")
+        if stats.rate != self.sample_rate:
+            convert_file(filename, self.sample_rate)
+        print(f"Peak level: {stats.peak_dbfs:.1f} dBFS")
+        if stats.clipped:
+            print(f"⚠️ {stats.clipped} clipped samples, try speaking a bit softer")
+        if stats.overflows or stats.dropped:
+            print(f"⚠️ {stats.overflows} input overflows, {stats.dropped} samples dropped")
         
         try:
-            wf = wave.open(filename, 'wb')
-            wf.setnchannels(self.channels)
-            wf.setsampwidth(p.get_sample_size(self.audio_format))
-            wf.setframerate(self.sample_rate)
-            wf.writeframes(b''.join(frames))
-            wf.close()
-            
             # Try to transcribe what was said
             transcription = self._transcribe_audio(filename)
             
-            # Update metadata
-            self.voice_metadata["sample_count"] += 1
-            self.voice_metadata["total_duration"] += duration
-            self.voice_metadata["phrases"].append({
+            # Journal the new sample (one appended line)
+            phrase = {
                 "id": sample_id,
                 "filename": filename,
-                "duration": duration,
+                "duration": round(stats.duration, 2),
                 "prompt": prompt,
                 "transcription": transcription,
-                "date_recorded": time.strftime("%Y-%m-%d %H:%M:%S")
-            })
-            
-            # Save updated metadata
-            with open(self.metadata_file, "w") as f:
-                json.dump(self.voice_metadata, f, indent=2)
+                "date_recorded": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "peak": stats.peak,
+                "clipped": stats.clipped
+            }
+            if transcription is not None:
+                phrase.update(transcription_backend=self.transcription_backend, transcribed_at=time.time())
+            self.metadata.add(phrase)
             
             return filename, transcription
         except Exception as e:
@@ -156,12 +135,11 @@ class CustomVoiceTTS:
             return None, None
     
     def _transcribe_audio(self, audio_file):
-        """Transcribe the recorded audio"""
+        """Transcribe the recorded audio; "" if no speech was heard, None on error"""
         try:
-            with sr.AudioFile(audio_file) as source:
-                audio = self.recognizer.record(source)
-                text = self.recognizer.recognize_google(audio)
-                return text
+            if self._transcribe is None:
+                self._transcribe = get_backend(self.transcription_backend, self.transcription_language)
+            return self._transcribe(audio_file) or ""
         except Exception as e:
             print(f"Transcription error: {e}")
             return None
@@ -175,7 +153,8 @@ class CustomVoiceTTS:
         os.makedirs(processed_dir, exist_ok=True)
         
         # Process each sample
-        for phrase in tqdm(self.voice_metadata["phrases"]):
+        changes = []
+        for phrase in tqdm(list(self.voice_metadata["phrases"])):
             sample_path = phrase["filename"]
             
             if not os.path.exists(sample_path):
@@ -183,41 +162,161 @@ class CustomVoiceTTS:
                 continue
             
             try:
-                # Load audio
-                audio, sr = sf.read(sample_path)
-                
-                # Normalize audio
-                audio = audio / (np.max(np.abs(audio)) + 1e-8)  # Prevent division by zero
-                
-                # Apply light compression
-                audio = np.sign(audio) * np.log(1 + 5 * np.abs(audio)) / np.log(6)
+                # Samples from before the canonical rate are converted once, in place
+                convert_file(sample_path, self.sample_rate)
                 
-                # Remove silence
-                audio_abs = np.abs(audio)
-                threshold = 0.02
-                mask = audio_abs > threshold
-                
-                # Only trim if there's enough audio left
-                if np.sum(mask) > 0.5 * len(audio):
-                    start = np.argmax(mask)
-                    end = len(audio) - np.argmax(mask[::-1])
-                    audio = audio[start:end]
-                
-                # Save processed audio
+                # Normalize, compress and remove silence block by block, so
+                # memory stays bounded however long the recording is
                 processed_path = os.path.join(processed_dir, os.path.basename(sample_path))
-                sf.write(processed_path, audio, sr)
+                process_file(sample_path, processed_path)
                 
                 # Update path in metadata
-                phrase["processed_file"] = processed_path
+                if phrase.get("processed_file") != processed_path:
+                    changes.append((phrase["id"], {"processed_file": processed_path}))
             except Exception as e:
                 print(f"Error processing sample {sample_path}: {e}")
         
-        # Save updated metadata
-        with open(self.metadata_file, "w") as f:
-            json.dump(self.voice_metadata, f, indent=2)
+        # Journal only the samples whose entry changed
+        self.metadata.update_many(changes)
         
         print(f"Processed {len(self.voice_metadata['phrases'])} voice samples.")
     
+    def ingest_recordings(self, paths, backend="google", language="en-US", workers=4, **vad_options):
+        """Split long recordings into utterances and add them as samples in one batch"""
+        transcribe = get_backend(backend, language)
+        processed_dir = os.path.join(self.voice_model_dir, "processed")
+        os.makedirs(processed_dir, exist_ok=True)
+        
+        def safe_transcribe(filename):
+            """Text, "" when no speech was heard, or None on error (retried later)"""
+            try:
+                return transcribe(filename) or ""
+            except Exception as e:
+                print(f"Transcription error for {filename}: {e}")
+                return None
+        
+        # Fingerprints of accepted segments, bucketed by ~5% duration steps
+        # so each new segment is only compared with similar-length ones
+        buckets = {}
+        new_phrases = []
+        futures = []
+        duplicates = 0
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            for path in paths:
+                print(f"Segmenting {path}...")
+                for start, end in detect_utterances(path, **vad_options):
+                    audio, src_rate = sf.read(path, start=start, stop=end, dtype="float32")
+                    duration = (end - start) / src_rate
+                    # Segments are stored at the dataset rate, whatever the source used
+                    audio = to_canonical(audio, src_rate, self.sample_rate)
+                    rate = self.sample_rate
+                    
+                    fp = fingerprint(audio, rate)
+                    bucket = int(math.log(duration) / math.log(1.05))
+                    candidates = [c for b in (bucket - 1, bucket, bucket + 1) for c in buckets.get(b, [])]
+                    if any(is_near_duplicate(fp, other, duration, other_duration)
+                           for other, other_duration in candidates):
+                        duplicates += 1
+                        continue
+                    buckets.setdefault(bucket, []).append((fp, duration))
+                    
+                    sample_id, filename = self.metadata.claim_sample_path(self.voice_samples_dir)
+                    sf.write(filename, audio, rate, subtype="PCM_16")
+                    processed_path = os.path.join(processed_dir, os.path.basename(filename))
+                    process_file(filename, processed_path)
+                    
+                    new_phrases.append({
+                        "id": sample_id,
+                        "filename": filename,
+                        "duration": round(duration, 2),
+                        "prompt": None,
+                        "transcription": None,
+                        "date_recorded": time.strftime("%Y-%m-%d %H:%M:%S"),
+                        "processed_file": processed_path,
+                        "source": {"file": path, "start": start / src_rate, "end": end / src_rate}
+                    })
+                    # Transcribe while the next segments are being cut
+                    futures.append(pool.submit(safe_transcribe, filename))
+            
+            for phrase, future in zip(new_phrases, tqdm(futures, desc="Transcribing")):
+                phrase["transcription"] = future.result()
+                if phrase["transcription"] is not None:
+                    phrase.update(transcription_backend=backend, transcribed_at=time.time())
+        
+        # Single journal write for the whole batch
+        self.metadata.add(*new_phrases)
+        
+        print(f"Ingested {len(new_phrases)} segments ({duplicates} near-duplicates skipped).")
+        return new_phrases
+    
+    def _needs_transcription(self, phrase):
+        """Untranscribed, or the audio changed after it was transcribed.
+
+        An empty transcription with transcribed_at means no speech was
+        heard; it is only retried if the audio changes.
+        """
+        transcribed_at = phrase.get("transcribed_at")
+        if transcribed_at is None:
+            return not phrase.get("transcription")
+        if not os.path.exists(phrase["filename"]):
+            return False
+        return os.path.getmtime(phrase["filename"]) > transcribed_at
+    
+    def transcribe_all(self, backend="google", language="en-US", workers=4,
+                       retries=3, force=False, background=False):
+        """Transcribe every untranscribed or stale sample concurrently.
+        
+        With background=True this returns the worker thread immediately so
+        recording can carry on; each result is journaled as it comes in.
+        """
+        if background:
+            thread = threading.Thread(target=self.transcribe_all, daemon=True, kwargs={
+                "backend": backend, "language": language, "workers": workers,
+                "retries": retries, "force": force
+            })
+            thread.start()
+            return thread
+        
+        transcribe = get_backend(backend, language)
+        pending = [p for p in list(self.voice_metadata["phrases"])
+                   if os.path.exists(p["filename"]) and (force or self._needs_transcription(p))]
+        
+        if not pending:
+            print("All samples are already transcribed.")
+            return 0
+        
+        def work(phrase):
+            """Returns (succeeded, text); text is None when no speech was heard"""
+            error = None
+            attempts = max(1, retries)
+            for attempt in range(attempts):
+                try:
+                    return True, transcribe(phrase["filename"])
+                except Exception as e:
+                    error = e
+                    # Jittered exponential backoff before the next try
+                    if attempt + 1 < attempts:
+                        time.sleep(min(8, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0))
+            print(f"Transcription failed for {phrase['filename']}: {error}")
+            return False, None
+        
+        updated = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(work, phrase): phrase for phrase in pending}
+            for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc="Transcribing"):
+                succeeded, text = future.result()
+                if not succeeded:
+                    continue  # Left pending; the next run retries it
+                
+                # One journal line per result, so a crash loses nothing finished
+                self.metadata.update(futures[future]["id"], transcription=text or "",
+                                     transcription_backend=backend, transcribed_at=time.time())
+                updated += 1
+        
+        print(f"Transcribed {updated} of {len(pending)} samples.")
+        return updated
+    
     def create_voice_model(self):
         """Create a simple voice model from the processed samples"""
         print("Creating voice model...")
@@ -225,9 +324,38 @@ class CustomVoiceTTS:
         # This is a simple placeholder for what would typically be a much more complex process
         # A real voice model would use deep learning techniques
         
-        # For our simple version, we'll just save a reference to all processed samples
+        # Analyze every take once here so the speaker can rank samples
+        # from stored numbers instead of touching audio at runtime
+        phrases = [dict(p) for p in self.voice_metadata["phrases"] if os.path.exists(p["filename"])]
+        
+        def analyze_phrase(phrase):
+            try:
+                # Quality is judged on the raw take; processed audio is normalized
+                return analyze_file(phrase["filename"], phrase.get("transcription"))
+            except Exception as e:
+                print(f"Error analyzing sample {phrase['filename']}: {e}")
+                return None
+        
+        accepted, rejected = [], []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+            for phrase, features in zip(phrases, tqdm(pool.map(analyze_phrase, phrases), total=len(phrases), desc="Analyzing")):
+                reasons = ["unreadable"] if features is None else rejection_reasons(features)
+                if reasons:
+                    rejected.append({"id": phrase["id"], "filename": phrase["filename"], "reasons": reasons})
+                    continue
+                phrase["features"] = features
+                phrase["quality"] = quality_score(features)
+                accepted.append(phrase)
+        
+        for take in rejected:
+            print(f"Rejected {os.path.basename(take['filename'])}: {', '.join(take['reasons'])}")
+        print(f"Accepted {len(accepted)} of {len(phrases)} samples.")
+        
         model_data = {
-            "samples": self.voice_metadata["phrases"],
+            "samples": accepted,
+            "rejected": rejected,
+            # Retrieval index over samples, so speakers never scan them per call
+            "index": build_index(accepted),
             "sample_rate": self.sample_rate,
             "created": time.strftime("%Y-%m-%d %H:%M:%S")
         }
@@ -268,18 +396,10 @@ class CustomVoiceTTS:
         
     def list_audio_devices(self):
         """List available audio input devices"""
-        p = pyaudio.PyAudio()
         print("\n=== Available Audio Input Devices ===")
         
-        info = p.get_host_api_info_by_index(0)
-        numdevices = info.get('deviceCount')
-        
-        for i in range(numdevices):
-            device_info = p.get_device_info_by_index(i)
-            if device_info.get('maxInputChannels') > 0:
-                print(f"Index {i}: {device_info.get('name')}")
-        
-        p.terminate()
+        for i, name in self.recorder.input_devices():
+            print(f"Index {i}: {name}")
         
         print("\nYou can select a specific device by adding:")
         print("tts = CustomVoiceTTS(input_device_index=YOUR_DEVICE_INDEX)")
@@ -343,7 +463,9 @@ def main():
                         for i in range(start_idx, start_idx + count):
                             if i < len(phrases):
                                 print(f"\nPhrase {i+1} of {start_idx + count}")
-                                result = tts.record_sample(duration=6, prompt=phrases[i])
+                                # The user already paused at "Press Enter" between phrases
+                                result = tts.record_sample(duration=6, prompt=phrases[i],
+                                                           countdown=3 if i == start_idx else 1)
                                 
                                 if result[0] is None:  # If recording failed
                                     if input("Recording failed. Try again? (y/n): ").lower() != 'y':
@@ -385,7 +507,6 @@ def main():
 import os
 import pickle
 import random
-import numpy as np
 import soundfile as sf
 from pydub import AudioSegment
 from pydub.playback import play
@@ -478,10 +599,50 @@ if __name__ == "__main__":
         
         elif choice == "5":
             print("\nExiting Custom Voice TTS Creator. Thank you!")
+            tts.recorder.close()
             break
         
         else:
             print("Invalid choice, please try again.")
 
+def cli():
+    parser = argparse.ArgumentParser(description="Custom voice TTS dataset tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    ingest = sub.add_parser("ingest", help="split long WAV recordings into voice samples")
+    ingest.add_argument("files", nargs="+", help="WAV files to ingest")
+    ingest.add_argument("--backend", choices=BACKENDS, default="google", help="recognizer used for transcription")
+    ingest.add_argument("--language", default="en-US")
+    ingest.add_argument("--workers", type=int, default=4, help="parallel transcription workers")
+    ingest.add_argument("--min-silence", type=float, default=0.4, help="pause (s) that separates utterances")
+    ingest.add_argument("--max-length", type=float, default=10.0, help="longest segment in seconds")
+    
+    sub.add_parser("compact", help="fold the metadata journal into metadata.json")
+    
+    transcribe = sub.add_parser("transcribe", help="transcribe untranscribed or stale samples")
+    transcribe.add_argument("--backend", choices=BACKENDS, default="google", help="recognizer used for transcription")
+    transcribe.add_argument("--language", default="en-US")
+    transcribe.add_argument("--workers", type=int, default=4, help="parallel transcription workers")
+    transcribe.add_argument("--retries", type=int, default=3)
+    transcribe.add_argument("--force", action="store_true", help="re-transcribe every sample")
+    
+    args = parser.parse_args()
+    tts = CustomVoiceTTS()
+    
+    if args.command == "ingest":
+        tts.ingest_recordings(args.files, backend=args.backend, language=args.language,
+                              workers=args.workers, min_silence=args.min_silence,
+                              max_length=args.max_length)
+    elif args.command == "transcribe":
+        tts.transcribe_all(backend=args.backend, language=args.language, workers=args.workers,
+                           retries=args.retries, force=args.force)
+    elif args.command == "compact":
+        count = tts.metadata.compact()
+        print(f"Compacted metadata for {count} samples into {tts.metadata_file}")
+
 if __name__ == "__main__":
-    main()
+    # Subcommands run unattended; no arguments opens the interactive menu
+    if len(sys.argv) > 1:
+        cli()
+    else:
+        main()
@@ -1,11 +1,12 @@
 from flask import Flask, render_template, request
-from flask_socketio import SocketIO, join_room, leave_room
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from room_registry import RoomRegistry
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret!'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-rooms = {}
+rooms = RoomRegistry()
 
 @socketio.on('connect')
 def handle_connect():
@@ -16,20 +17,22 @@ def handle_join_room(data):
     room = data['room']
     join_room(room)
     
-    if room not in rooms:
-        rooms[room] = []
-    
-    rooms[room].append(request.sid)
-    emit('existing_users', {'users': rooms[room]}, room=request.sid)
+    users = rooms.join(room, request.sid)
+    emit('existing_users', {'users': users}, room=request.sid)
     emit('user_joined', {'sid': request.sid}, room=room, include_self=False)
 
+@socketio.on('leave_room')
+def handle_leave_room(data):
+    room = data['room']
+    leave_room(room)
+    
+    if rooms.leave(room, request.sid):
+        emit('user_left', {'sid': request.sid}, room=room)
+
 @socketio.on('disconnect')
 def handle_disconnect():
-    for room, users in rooms.items():
-        if request.sid in users:
-            users.remove(request.sid)
-            emit('user_left', {'sid': request.sid}, room=room)
-            break
+    for room in rooms.disconnect(request.sid):
+        emit('user_left', {'sid': request.sid}, room=room)
 
 @socketio.on('offer')
 def handle_offer(data):
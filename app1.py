@@ -1,45 +1,133 @@
 import os
-import tempfile
 import threading
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from speech_recognition import Recognizer, AudioFile
-from googletrans import Translator
-from gtts import gTTS
+from speech_recognition import Recognizer, AudioFile, AudioData, UnknownValueError
+from speech_synthesis import synthesize
+from room_registry import RoomRegistry
+from client_pool import speech_pool, translator_pool
+from request_policy import RequestPolicy
+from local_asr import Wav2Vec2Recognizer
+from audio_transport import AudioTransport, SAMPLE_RATE, SAMPLE_WIDTH
+from language_id import LanguageRouter
+from resources import temp_path, start_temp_janitor, install_memory_signal, memory_report
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret!'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 recognizer = Recognizer()
-translator = Translator()
+
+# Keep-alive backend clients shared by all processing threads
+recognizer_clients = speech_pool(size=4, timeout=8)
+translator_clients = translator_pool(size=4, timeout=5)
+
+def _remote_recognize(audio, language):
+    with recognizer_clients.client() as client:
+        return client.recognize(audio, language=language)
+
+def _remote_translate(text, src, dest):
+    with translator_clients.client() as client:
+        return client.translate(text, src=src, dest=dest)
+
+# Capacity tests (loadtest.py) swap the network backends for local stubs
+STUB_BACKENDS = os.environ.get('APP1_STUB_BACKENDS', '0') == '1'
+if STUB_BACKENDS:
+    import stub_backends
+    _remote_recognize = stub_backends.recognize
+    _remote_translate = stub_backends.translate
+    synthesize = stub_backends.synthesize
+
+# Hedge slow calls, retry with backoff and fail over to local wav2vec2
+recognition_policy = RequestPolicy("Recognition", _remote_recognize,
+                                   fallback=None if STUB_BACKENDS else Wav2Vec2Recognizer().recognize,
+                                   deadline=8, non_retryable=(UnknownValueError,))
+translation_policy = RequestPolicy("Translation", _remote_translate, deadline=5)
+
+# Speakers who join with language "auto" are routed among these source
+# languages, with a per-speaker prior so regulars skip identification
+AUTO = 'auto'
+auto_router = LanguageRouter(os.environ.get('AUTO_LANGUAGES', 'bn:en,en:bn'), recognize=_remote_recognize)
 
 # Room management
-rooms = {}
-user_data = {}
+user_data = RoomRegistry()
+
+# Negotiated binary audio streams, one per speaker
+transport = AudioTransport()
+
+# Mix translated speech over the ducked original speaker (one stream per language)
+MIX_ORIGINAL = os.environ.get('MIX_ORIGINAL_AUDIO', '0') == '1'
+if MIX_ORIGINAL:
+    from audio_mixer import mix_ducked
 
-def process_audio(audio_path, lang, room, sid):
+def language_channel(room, language):
+    """Socket.IO room that carries one language's stream for a room"""
+    return f"{room}/lang/{language}"
+
+def process_audio(audio, lang, room, sid):
+    try:
+        if lang == AUTO:
+            _, lang, _ = auto_router.route(audio, sid)
+        try:
+            text = recognition_policy.execute(audio, lang)
+        except UnknownValueError:
+            auto_router.confirm(sid, lang.split('-')[0], None)
+            raise
+        auto_router.confirm(sid, lang.split('-')[0], text)
+        print(f"Recognized ({lang}): {text}")
+        
+        original_pcm = None
+        if MIX_ORIGINAL:
+            original_pcm = audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=SAMPLE_WIDTH)
+        
+        # Translate once per language actually spoken by listeners in the room
+        targets = set([u['language'] for u in user_data.infos(room) if u['language'] not in (None, AUTO)])
+        for target in targets:
+            # One failing language must not silence the rest of the room
+            try:
+                translate_for(text, lang, target, room, sid, original_pcm)
+            except Exception as e:
+                print(f"Translation error ({target}): {e}")
+    except Exception as e:
+        print(f"Processing error: {e}")
+
+def translate_for(text, lang, target, room, sid, original_pcm=None):
+    """Translate, synthesize and send one utterance to target's listeners"""
+    translation = translation_policy.execute(text, lang.split('-')[0], target)
+    payload = {
+        'text': translation,
+        'lang': target,
+        'sender': sid
+    }
+    if MIX_ORIGINAL:
+        # Synthesize straight to PCM at the mix rate; no second decode
+        translated_pcm = synthesize(translation, target, output='pcm', rate=SAMPLE_RATE)
+        payload['audio'] = mix_ducked(translated_pcm, original_pcm)
+        payload['format'] = 'pcm16'
+        payload['sample_rate'] = SAMPLE_RATE
+    else:
+        payload['audio'] = synthesize(translation, target, output='mp3')
+        payload['format'] = 'mp3'
+    
+    # Only listeners subscribed to this language receive it
+    socketio.emit('translated_audio', payload, room=language_channel(room, target))
+
+def process_wav_file(audio_path, lang, room, sid):
+    """Legacy path for clients that still send whole WAV files"""
     try:
         with AudioFile(audio_path) as source:
             audio = recognizer.record(source)
-            text = recognizer.recognize_google(audio, language=lang)
-            print(f"Recognized ({lang}): {text}")
-            
-            # Translate to all target languages in the room
-            targets = set([u['language'] for u in user_data[room].values()])
-            for target in targets:
-                translation = translator.translate(text, src=lang.split('-')[0], dest=target).text
-                tts = gTTS(translation, lang=target)
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-                    tts.save(fp.name)
-                    emit('translated_audio', {
-                        'text': translation,
-                        'path': fp.name,
-                        'lang': target,
-                        'sender': sid
-                    }, room=room)
     except Exception as e:
         print(f"Processing error: {e}")
+        return
+    finally:
+        os.remove(audio_path)
+    process_audio(audio, lang, room, sid)
+
+def process_pcm(pcm, lang, room, sid):
+    """Hand a decoded utterance straight to the recognizer"""
+    audio = AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH)
+    threading.Thread(target=process_audio, args=(audio, lang, room, sid)).start()
 
 @socketio.on('connect')
 def handle_connect():
@@ -50,47 +138,100 @@ def handle_connect():
 def handle_join_room(data):
     room = data['room']
     language = data['language']
+    # 'language' is what the client listens to (and by default speaks);
+    # speakers in auto mode also name the language they listen to
+    speaking = data.get('speaking', language)
+    if language == AUTO:
+        speaking, language = AUTO, data.get('listen')
+    if not language or language == AUTO:
+        emit('join_error', {'error': 'a listening language is required'})
+        return
     join_room(room)
+    join_room(language_channel(room, language))
     
-    if room not in user_data:
-        user_data[room] = {}
-    
-    user_data[room][request.sid] = {
+    users = user_data.join(room, request.sid, {
         'language': language,
+        'speaking': speaking,
         'camera_on': False,
         'mic_on': False
-    }
+    })
     
     # Notify others in the room
     emit('user_joined', {
         'sid': request.sid,
-        'users': list(user_data[room].keys())
+        'users': users
     }, room=room, include_self=False)
     
     # Send existing users to new member
     emit('existing_users', {
-        'users': list(user_data[room].keys())
+        'users': users
     }, room=request.sid)
 
+@socketio.on('leave_room')
+def handle_leave_room(data):
+    room = data['room']
+    info = user_data.member_info(room, request.sid)
+    leave_room(room)
+    if info:
+        leave_room(language_channel(room, info['language']))
+    
+    if user_data.leave(room, request.sid):
+        emit('user_left', {'sid': request.sid}, room=room)
+
+@socketio.on('set_language')
+def handle_set_language(data):
+    # Move the listener to a different translated stream
+    room = data['room']
+    info = user_data.member_info(room, request.sid)
+    if info is None:
+        return
+    
+    if not data.get('language') or data['language'] == AUTO:
+        return
+    leave_room(language_channel(room, info['language']))
+    info['language'] = data['language']
+    join_room(language_channel(room, info['language']))
+
+@socketio.on('audio_config')
+def handle_audio_config(data):
+    # Client offers codecs in preference order, e.g. ['opus', 'pcm16']
+    try:
+        config = transport.open(request.sid, data.get('codecs'), data.get('frame_ms', 20))
+    except ValueError as e:
+        emit('audio_config', {'error': str(e)})
+        return
+    if config is None:
+        emit('audio_config', {'error': 'no supported codec'})
+    else:
+        emit('audio_config', config)
+
 @socketio.on('audio_chunk')
 def handle_audio_chunk(data):
     try:
         room = data['room']
-        lang = user_data[room][request.sid]['language']
+        info = user_data.member_info(room, request.sid)
+        lang = info.get('speaking', info['language'])
+        
+        if transport.get(request.sid) is not None:
+            # Negotiated stream: data['chunk'] is one binary frame
+            pcm = transport.feed(request.sid, data['chunk'])
+            if pcm:
+                process_pcm(pcm, lang, room, request.sid)
+            return
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as fp:
+        # Removed after processing; the janitor reclaims any that are orphaned
+        path = temp_path(".wav")
+        with open(path, "wb") as fp:
             fp.write(data['chunk'])
-            threading.Thread(target=process_audio, args=(fp.name, lang, room, request.sid)).start()
+        threading.Thread(target=process_wav_file, args=(path, lang, room, request.sid)).start()
     except Exception as e:
         print(f"Audio handling error: {e}")
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    for room in user_data:
-        if request.sid in user_data[room]:
-            del user_data[room][request.sid]
-            emit('user_left', {'sid': request.sid}, room=room)
-            break
+    transport.close(request.sid)
+    for room in user_data.disconnect(request.sid):
+        emit('user_left', {'sid': request.sid}, room=room)
 
 # WebRTC Signaling
 @socketio.on('offer')
@@ -118,5 +259,21 @@ def handle_ice_candidate(data):
 def index():
     return render_template('index.html')
 
+@app.route('/debug/memory')
+def debug_memory():
+    """RSS, threads, rooms and top allocators; the first call starts tracemalloc"""
+    if request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({'error': 'local requests only'}), 403
+    report = memory_report(int(request.args.get('limit', 15)))
+    report['rooms'] = len(user_data)
+    return jsonify(report)
+
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host='0.0.0.0',port=3000)
+    if not STUB_BACKENDS:
+        recognizer_clients.start()
+        translator_clients.start()
+    start_temp_janitor()
+    install_memory_signal()
+    # No reloader under load tests: it would fork a second server process
+    socketio.run(app, debug=not STUB_BACKENDS, host='0.0.0.0',
+                 port=int(os.environ.get('PORT', 3000)))
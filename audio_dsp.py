@@ -0,0 +1,285 @@
+import collections
+import math
+
+import numpy as np
+import soundfile as sf
+
+# Streaming defaults for process_samples
+BLOCK_SIZE = 65536          # samples read per block
+FRAME_MS = 20               # silence detection frame
+SILENCE_DB = -40.0          # frame RMS relative to the file peak, before compression
+NOISE_MARGIN_DB = 6.0       # ...or this far above the noise floor, if higher
+MAX_SILENCE_DB = -20.0      # but never so high that quiet speech is cut
+NOISE_PERCENTILE = 10       # frame level taken as the noise floor
+HIST_FLOOR_DB = -120.0      # range and resolution of the level histogram
+HIST_STEP_DB = 0.5
+MAX_PAUSE = 0.3             # internal pauses longer than this are shortened
+KEEP_PAUSE = 0.15           # ...to this many seconds (rounded up to whole frames)
+COMPRESSION = 5.0
+
+
+def normalize(audio, peak, out=None):
+    """Scale audio so that peak maps to 1.0"""
+    return np.multiply(audio, 1.0 / (peak + 1e-8), out=out)
+
+
+def compress(audio, amount=COMPRESSION, out=None):
+    """Light log compression: sign(x) * log(1 + a|x|) / log(1 + a)"""
+    negative = audio < 0  # 1 byte per sample; the sign is lost below when out is audio
+    out = np.abs(audio, out=out)
+    np.multiply(out, amount, out=out)
+    np.log1p(out, out=out)
+    np.multiply(out, 1.0 / np.log1p(amount), out=out)
+    np.negative(out, out=out, where=negative)
+    return out
+
+
+def frame_rms(audio, frame_length):
+    """RMS of consecutive frames (the last partial frame included)"""
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    n_frames = -(-len(audio) // frame_length)
+    padded = np.zeros(n_frames * frame_length, dtype=audio.dtype)
+    padded[:len(audio)] = audio
+    frames = padded.reshape(n_frames, frame_length)
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame_length)
+
+
+def scan_peak(path, blocksize=BLOCK_SIZE):
+    """First pass: global peak of a file, read one block at a time"""
+    peak = 0.0
+    for block in sf.blocks(path, blocksize=blocksize, dtype="float32"):
+        if len(block):
+            peak = max(peak, float(np.max(np.abs(block))))
+    return peak
+
+
+def scan_levels(path, frame_length, blocksize=BLOCK_SIZE, percentile=NOISE_PERCENTILE):
+    """First pass: (peak, noise floor in dBFS) of a file.
+
+    The floor is the frame RMS below which percentile % of frames fall,
+    read from a fixed histogram so memory does not grow with the file.
+    """
+    peak = 0.0
+    bins = int(-HIST_FLOOR_DB / HIST_STEP_DB) + 1
+    counts = np.zeros(bins, dtype=np.int64)
+    for block in sf.blocks(path, blocksize=blocksize, dtype="float32", always_2d=False):
+        if not len(block):
+            continue
+        peak = max(peak, float(np.max(np.abs(block))))
+        levels = 20 * np.log10(frame_rms(block, frame_length) + 1e-12)
+        index = np.clip(((levels - HIST_FLOOR_DB) / HIST_STEP_DB).astype(np.int64), 0, bins - 1)
+        counts += np.bincount(index, minlength=bins)
+    total = counts.sum()
+    if not total:
+        return peak, HIST_FLOOR_DB
+    floor_bin = int(np.searchsorted(np.cumsum(counts), total * percentile / 100))
+    return peak, HIST_FLOOR_DB + floor_bin * HIST_STEP_DB
+
+
+def silence_threshold(peak, noise_floor_db, silence_db=SILENCE_DB, margin_db=NOISE_MARGIN_DB,
+                      max_db=MAX_SILENCE_DB):
+    """Frame RMS threshold for peak-normalized audio.
+
+    silence_db below the peak, raised to margin_db above the noise floor
+    for noisy recordings, and capped at max_db.
+    """
+    floor_db = noise_floor_db - 20 * np.log10(peak + 1e-12)
+    return 10 ** (min(max(silence_db, floor_db + margin_db), max_db) / 20)
+
+
+class SilenceRemover:
+    """Frame-based silence removal that works block by block.
+
+    Leading and trailing silence is dropped. Internal pauses longer than
+    max_pause are shortened to keep_pause, rounded up to an even number of
+    frames (160 ms with the defaults), by keeping their first and last
+    halves. At most max_pause worth of audio is ever held back, so memory
+    does not depend on how long the pause or the file is.
+    """
+
+    def __init__(self, rate, frame_ms=FRAME_MS, threshold=10 ** (SILENCE_DB / 20),
+                 max_pause=MAX_PAUSE, keep_pause=KEEP_PAUSE):
+        self.frame_length = max(1, int(rate * frame_ms / 1000))
+        self.threshold = threshold
+        self.max_pause_frames = max(1, int(max_pause * 1000 / frame_ms))
+        self.keep_half = max(1, math.ceil(keep_pause * 1000 / frame_ms / 2))
+        self.seen_speech = False
+        self._pause = []
+        self._pause_tail = None  # deque once the pause is known to be long
+
+    def _hold(self, frame):
+        # Copy so a held frame doesn't keep its whole block alive
+        frame = frame.copy()
+        if self._pause_tail is not None:
+            self._pause_tail.append(frame)
+            return
+        self._pause.append(frame)
+        if len(self._pause) > self.max_pause_frames:
+            # Long pause: from now on only its head and tail are kept
+            self._pause_tail = collections.deque(self._pause[-self.keep_half:], maxlen=self.keep_half)
+            del self._pause[self.keep_half:]
+
+    def _release(self):
+        """Speech resumed: return what is kept of the pause before it"""
+        if not self.seen_speech:
+            held = []  # Leading silence
+        elif self._pause_tail is not None:
+            held = self._pause + list(self._pause_tail)
+        else:
+            held = self._pause
+        self._pause = []
+        self._pause_tail = None
+        return held
+
+    def process(self, block, levels=None):
+        """Feed one block; returns the list of arrays to write now.
+
+        levels are the frame RMS values to compare with the threshold,
+        when they come from a different stage of the signal than block.
+        """
+        if levels is None:
+            levels = frame_rms(block, self.frame_length)
+        voiced = levels > self.threshold
+        output = []
+        for i, is_voiced in enumerate(voiced):
+            frame = block[i * self.frame_length:(i + 1) * self.frame_length]
+            if is_voiced:
+                if self._pause:
+                    output.extend(self._release())
+                self.seen_speech = True
+                output.append(frame)
+            else:
+                self._hold(frame)
+        return output
+
+    def flush(self):
+        """End of input: trailing silence is dropped"""
+        self._pause = []
+        self._pause_tail = None
+        return []
+
+
+def process_file(in_path, out_path, blocksize=BLOCK_SIZE, compression=COMPRESSION, **silence_options):
+    """Normalize, compress and remove silence from in_path into out_path.
+
+    Runs in two passes over the file (peak and noise floor scan, then
+    processing) and writes the output incrementally, so memory stays
+    O(blocksize) for recordings of any length. Silence is judged on the
+    normalized signal before compression, which would lift the noise
+    floor towards speech level. Returns (input_seconds, output_seconds).
+    """
+    info = sf.info(in_path)
+    rate = info.samplerate
+    # Whole frames per block so frame boundaries never straddle blocks
+    frame_length = max(1, int(rate * silence_options.get("frame_ms", FRAME_MS) / 1000))
+    blocksize = max(frame_length, blocksize - blocksize % frame_length)
+
+    peak, noise_floor_db = scan_levels(in_path, frame_length, blocksize)
+    silence_options.setdefault("threshold", silence_threshold(peak, noise_floor_db))
+    remover = SilenceRemover(rate, **silence_options)
+    written = 0
+
+    with sf.SoundFile(out_path, "w", samplerate=rate, channels=info.channels, subtype="PCM_16") as out:
+        for block in sf.blocks(in_path, blocksize=blocksize, dtype="float32", always_2d=False):
+            normalize(block, peak, out=block)
+            levels = frame_rms(block, frame_length)
+            compress(block, compression, out=block)
+            for chunk in remover.process(block, levels):
+                out.write(chunk)
+                written += len(chunk)
+        for chunk in remover.flush():
+            out.write(chunk)
+            written += len(chunk)
+
+    if written == 0:
+        # Nothing crossed the threshold; keep the cleaned audio untrimmed
+        # rather than producing an empty sample
+        with sf.SoundFile(out_path, "w", samplerate=rate, channels=info.channels, subtype="PCM_16") as out:
+            for block in sf.blocks(in_path, blocksize=blocksize, dtype="float32", always_2d=False):
+                normalize(block, peak, out=block)
+                out.write(compress(block, compression, out=block))
+                written += len(block)
+
+    return info.frames / rate, written / rate
+
+
+def detect_utterances(path, threshold_db=-35.0, min_silence=0.4, min_length=1.0,
+                      max_length=10.0, frame_ms=FRAME_MS, blocksize=BLOCK_SIZE):
+    """Energy VAD over a long recording.
+
+    Yields (start_frame, end_frame) sample ranges of utterances separated
+    by at least min_silence seconds of audio below threshold_db relative
+    to the file peak. Utterances shorter than min_length are skipped and
+    longer ones are cut at max_length. Reads the file block by block.
+    """
+    info = sf.info(path)
+    rate = info.samplerate
+    frame_length = max(1, int(rate * frame_ms / 1000))
+    blocksize = max(frame_length, blocksize - blocksize % frame_length)
+
+    threshold = scan_peak(path, blocksize) * 10 ** (threshold_db / 20)
+    silence_frames = int(min_silence * 1000 / frame_ms)
+    min_samples = int(min_length * rate)
+    max_samples = int(max_length * rate)
+
+    start = None       # first sample of the current utterance
+    last_voiced = 0    # end sample of the last voiced frame
+    quiet = 0          # consecutive silent frames
+    position = 0
+
+    for block in sf.blocks(path, blocksize=blocksize, dtype="float32", always_2d=False):
+        for i, level in enumerate(frame_rms(block, frame_length)):
+            frame_start = position + i * frame_length
+            frame_end = min(frame_start + frame_length, position + len(block))
+            if level > threshold:
+                if start is None:
+                    start = frame_start
+                last_voiced = frame_end
+                quiet = 0
+            elif start is not None:
+                quiet += 1
+
+            if start is not None and (quiet >= silence_frames or frame_end - start >= max_samples):
+                end = last_voiced if quiet else frame_end
+                if end - start >= min_samples:
+                    yield start, end
+                start = None
+                quiet = 0
+        position += len(block)
+
+    if start is not None and last_voiced - start >= min_samples:
+        yield start, last_voiced
+
+
+def fingerprint(audio, rate, bins=32, bands=16):
+    """Unit vector of loudness envelope plus coarse spectrum.
+
+    Two takes of the same clip score close to 1.0 with np.dot; different
+    speech, or the same length with different content, scores lower.
+    """
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    envelope = frame_rms(audio, max(1, len(audio) // bins))[:bins]
+
+    # Log-spaced band energies between 80 Hz and Nyquist
+    spectrum = np.abs(np.fft.rfft(audio))
+    freqs = np.fft.rfftfreq(len(audio), 1.0 / rate)
+    edges = np.geomspace(80, rate / 2, bands + 1)
+    band_index = np.clip(np.searchsorted(edges, freqs) - 1, 0, bands - 1)
+    spectral = np.log1p(np.bincount(band_index, weights=spectrum, minlength=bands))
+
+    parts = []
+    for part in (envelope, spectral):
+        norm = np.linalg.norm(part)
+        parts.append(part / norm if norm else part)
+    return np.concatenate(parts) / np.sqrt(2)
+
+
+def is_near_duplicate(a, b, duration_a, duration_b, similarity=0.98, duration_tolerance=0.05):
+    """True when two clips have matching length and loudness envelope"""
+    if abs(duration_a - duration_b) > duration_tolerance * max(duration_a, duration_b):
+        return False
+    if len(a) != len(b):
+        return False
+    return float(np.dot(a, b)) >= similarity
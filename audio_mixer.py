@@ -0,0 +1,27 @@
+import numpy as np
+
+# Gain applied to the original speaker under the translated voice (about -14 dB)
+DUCK_GAIN = 0.2
+
+
+def _as_int16(pcm):
+    if isinstance(pcm, np.ndarray):
+        return pcm
+    return np.frombuffer(pcm, dtype=np.int16)
+
+
+def mix_ducked(translated_pcm, original_pcm, duck_gain=DUCK_GAIN):
+    """Mix translated speech over a ducked copy of the original.
+
+    Both inputs are mono int16 PCM (arrays or bytes) at the same rate.
+    The result is as long as the longer of the two.
+    """
+    translated = _as_int16(translated_pcm)
+    original = _as_int16(original_pcm)
+
+    mixed = np.zeros(max(len(translated), len(original)), dtype=np.float32)
+    mixed[:len(original)] += original * duck_gain
+    mixed[:len(translated)] += translated
+
+    np.clip(mixed, -32768, 32767, out=mixed)
+    return mixed.astype(np.int16).tobytes()
@@ -0,0 +1,74 @@
+from math import gcd
+from functools import lru_cache
+
+import numpy as np
+
+# Internal format for captured and stored speech: mono float32 in [-1, 1]
+# at 16 kHz (int16 on disk). It is what wav2vec2, the Socket.IO transport
+# and the bundled voice samples use, so most audio needs no conversion.
+CANONICAL_RATE = 16000
+
+# Kaiser-windowed FIR as designed by scipy.signal.resample_poly
+_KAISER_BETA = 5.0
+_HALF_LENGTH = 10
+
+
+@lru_cache(maxsize=32)
+def _filter(up, down):
+    """Anti-aliasing FIR for an up/down ratio, designed once per ratio"""
+    from scipy.signal import firwin
+    max_rate = max(up, down)
+    # resample_poly scales the taps by up itself
+    taps = firwin(2 * _HALF_LENGTH * max_rate + 1, 1.0 / max_rate, window=("kaiser", _KAISER_BETA))
+    taps.flags.writeable = False
+    return taps
+
+
+def resample(audio, rate, target_rate):
+    """Polyphase sample-rate conversion (no-op when rates match)"""
+    if rate == target_rate:
+        return audio
+    from scipy.signal import resample_poly
+    g = gcd(int(rate), int(target_rate))
+    up, down = int(target_rate) // g, int(rate) // g
+    return resample_poly(audio, up, down, axis=0, window=_filter(up, down)).astype(np.float32)
+
+
+def to_float32(audio):
+    """Convert int16 PCM bytes or an int/float NumPy array to mono float32"""
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        audio = np.frombuffer(audio, dtype=np.int16)
+    audio = np.asarray(audio)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if audio.dtype == np.int16:
+        return audio.astype(np.float32) / 32768.0
+    return audio.astype(np.float32, copy=False)
+
+
+def to_pcm16(audio):
+    """Float samples in [-1, 1] to int16"""
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def to_canonical(audio, rate, target_rate=CANONICAL_RATE):
+    """Mono float32 at target_rate, converted in a single step"""
+    return resample(to_float32(audio), rate, target_rate)
+
+
+def load(path, rate=CANONICAL_RATE):
+    """Read a WAV/FLAC file as mono float32 at rate"""
+    import soundfile as sf
+    audio, file_rate = sf.read(path, dtype="float32")
+    return to_canonical(audio, file_rate, rate)
+
+
+def convert_file(path, rate=CANONICAL_RATE):
+    """Rewrite a file in place as mono 16-bit PCM at rate; returns True if it changed"""
+    import soundfile as sf
+    info = sf.info(path)
+    if info.samplerate == rate and info.channels == 1 and info.subtype == "PCM_16":
+        return False
+    audio = load(path, rate)
+    sf.write(path, audio, rate, subtype="PCM_16")
+    return True
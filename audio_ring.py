@@ -0,0 +1,148 @@
+import threading
+from collections import namedtuple, OrderedDict
+from multiprocessing import shared_memory
+
+# ~40 s of 16-bit mono at 48 kHz: several 4 s utterances can be in flight
+RING_BYTES = 4 * 1024 * 1024
+
+# What workers receive instead of audio: where the utterance sits in which
+# segment. Small and picklable, so it is as cheap to send to a process as
+# to a thread.
+AudioSlice = namedtuple("AudioSlice", "name offset length sample_rate sample_width")
+
+
+# Segments this process has opened, by name
+_segments = {}
+_segments_lock = threading.Lock()
+
+
+def _attach(name):
+    """Open an existing segment without letting this process unlink it on exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 every attach is registered with the resource
+        # tracker, which would destroy the segment when a worker exits
+        shm = shared_memory.SharedMemory(name=name)
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class AudioRing:
+    """Shared-memory ring that captured utterances are written into once.
+
+    The capturing side writes each utterance contiguously and hands out an
+    AudioSlice; workers in this or any other process resolve the slice to
+    an sr.AudioData over a view of the segment, so the samples are never
+    copied again on their way to the recognizer. Space is reused only
+    after release(), which the writer calls when a worker is done.
+    """
+
+    def __init__(self, size=RING_BYTES, name=None):
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.shm.name
+        self.size = size
+        self.head = 0                   # next write position (monotonic)
+        self._in_flight = OrderedDict()  # start -> [end, released], oldest first
+        self._lock = threading.Lock()
+        # Threads in the writing process resolve slices through this mapping
+        with _segments_lock:
+            _segments[self.name] = self.shm
+
+    def _tail(self):
+        """Start of the oldest region still in use"""
+        return next(iter(self._in_flight), self.head)
+
+    def write(self, data, sample_rate, sample_width):
+        """Copy captured bytes into the ring.
+
+        Returns (slice, token), or (None, None) when the ring is full of
+        audio that has not been released yet.
+        """
+        length = len(data)
+        if length > self.size:
+            return None, None
+        with self._lock:
+            start = self.head
+            # Utterances never wrap: skip the tail of the buffer instead
+            if start % self.size + length > self.size:
+                start += self.size - start % self.size
+            if start + length - self._tail() > self.size:
+                return None, None
+            offset = start % self.size
+            self.shm.buf[offset:offset + length] = data
+            self._in_flight[start] = [start + length, False]
+            self.head = start + length
+        return AudioSlice(self.name, offset, length, sample_rate, sample_width), start
+
+    def write_audio(self, audio):
+        return self.write(audio.frame_data, audio.sample_rate, audio.sample_width)
+
+    def release(self, token):
+        """Mark a written region as consumed so its space can be reused"""
+        with self._lock:
+            region = self._in_flight.get(token)
+            if region is None:
+                return
+            region[1] = True
+            while self._in_flight:
+                start, (end, released) = next(iter(self._in_flight.items()))
+                if not released:
+                    break
+                del self._in_flight[start]
+
+    def in_flight(self):
+        with self._lock:
+            return sum(1 for _, released in self._in_flight.values() if not released)
+
+    def close(self):
+        """Unmap and remove the segment; stop every reader first.
+
+        Raises BufferError while a view of the segment is still held.
+        """
+        self.shm.close()
+        with _segments_lock:
+            _segments.pop(self.name, None)
+        self.shm.unlink()
+
+
+class Lease:
+    """Keeps a ring region until every holder of its audio has closed.
+
+    The writer holds the first reference; each consumer that may outlive
+    it (e.g. a recognition call still running after its caller timed
+    out) acquires its own and closes it when finished.
+    """
+
+    def __init__(self, release):
+        self._release = release
+        self._count = 1
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self._count += 1
+        return self
+
+    def close(self):
+        with self._lock:
+            self._count -= 1
+            last = self._count == 0
+        if last:
+            self._release()
+
+
+def view(audio_slice):
+    """Read-only memoryview of a slice's bytes (attaches on first use)"""
+    with _segments_lock:
+        shm = _segments.get(audio_slice.name)
+        if shm is None:
+            shm = _segments[audio_slice.name] = _attach(audio_slice.name)
+    return shm.buf[audio_slice.offset:audio_slice.offset + audio_slice.length].toreadonly()
+
+
+def resolve(audio_slice):
+    """sr.AudioData backed directly by the shared segment"""
+    import speech_recognition as sr
+    return sr.AudioData(view(audio_slice), audio_slice.sample_rate, audio_slice.sample_width)
@@ -0,0 +1,179 @@
+import struct
+import threading
+
+# Canonical wire format for streamed speech
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # 16-bit PCM
+CHANNELS = 1
+
+CODEC_OPUS = "opus"
+CODEC_PCM16 = "pcm16"
+
+# Frame header: sequence number (uint32) + flags (uint8), little endian
+FRAME_HEADER = struct.Struct("<IB")
+FLAG_END_OF_UTTERANCE = 0x01
+SEQ_MODULO = 2 ** 32
+
+# Frame durations a client may offer (the ones Opus can encode)
+FRAME_SIZES_MS = (2.5, 5, 10, 20, 40, 60)
+MAX_CONCEALED = 50   # frames of a gap filled in; longer gaps just resync
+LATE_WINDOW = 50     # frames behind that count as late rather than a restart
+
+try:
+    import opuslib
+except ImportError:
+    opuslib = None
+
+
+def supported_codecs():
+    """Codecs this server can decode, in order of preference"""
+    if opuslib is not None:
+        return [CODEC_OPUS, CODEC_PCM16]
+    return [CODEC_PCM16]
+
+
+def negotiate_codec(offered):
+    """Pick the best codec from the list a client offered"""
+    offered = offered or [CODEC_PCM16]
+    for codec in supported_codecs():
+        if codec in offered:
+            return codec
+    return None
+
+
+def check_frame_ms(frame_ms):
+    """frame_ms as a number if it is an Opus frame size, else ValueError"""
+    try:
+        frame_ms = float(frame_ms)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid frame_ms: {frame_ms!r}")
+    if frame_ms not in FRAME_SIZES_MS:
+        raise ValueError(f"frame_ms must be one of {', '.join(map(str, FRAME_SIZES_MS))}")
+    return int(frame_ms) if frame_ms.is_integer() else frame_ms
+
+
+def encode_frame(seq, payload, end_of_utterance=False):
+    """Build a binary frame (used by clients and load tests)"""
+    flags = FLAG_END_OF_UTTERANCE if end_of_utterance else 0
+    return FRAME_HEADER.pack(seq & 0xFFFFFFFF, flags) + bytes(payload)
+
+
+class SpeakerStream:
+    """Decodes sequence-numbered frames from one speaker into a PCM buffer"""
+
+    def __init__(self, codec, frame_ms=20, max_seconds=10):
+        if codec not in supported_codecs():
+            raise ValueError(f"Unsupported codec: {codec}")
+
+        self.codec = codec
+        self.frame_ms = check_frame_ms(frame_ms)
+        self.frame_samples = int(SAMPLE_RATE * self.frame_ms / 1000)
+        self.max_bytes = SAMPLE_RATE * SAMPLE_WIDTH * max_seconds
+        self.buffer = bytearray()
+        self.next_seq = None
+        self.lost_frames = 0
+        self.decoder = None
+
+        if codec == CODEC_OPUS:
+            self.decoder = opuslib.Decoder(SAMPLE_RATE, CHANNELS)
+
+    def _decode(self, payload):
+        if self.codec == CODEC_OPUS:
+            return self.decoder.decode(payload, self.frame_samples)
+        if len(payload) % SAMPLE_WIDTH:
+            raise ValueError("pcm16 payload has an odd number of bytes")
+        return payload
+
+    def _conceal(self, missing):
+        """Fill a sequence gap so timing downstream stays intact"""
+        self.lost_frames += missing
+        # Never past the utterance limit
+        room = max(0, self.max_bytes - len(self.buffer)) // (self.frame_samples * SAMPLE_WIDTH)
+        for _ in range(min(missing, room)):
+            if self.codec == CODEC_OPUS:
+                # Opus packet loss concealment
+                self.buffer += self.decoder.decode(b"", self.frame_samples)
+            else:
+                self.buffer += bytes(self.frame_samples * SAMPLE_WIDTH)
+
+    def push(self, frame):
+        """Add one frame. Returns finished utterance PCM or None."""
+        if len(frame) < FRAME_HEADER.size:
+            raise ValueError("Truncated audio frame")
+
+        seq, flags = FRAME_HEADER.unpack_from(frame)
+        payload = memoryview(frame)[FRAME_HEADER.size:]
+
+        if self.next_seq is not None and seq != self.next_seq:
+            # Distance modulo 2^32, so the counter may wrap
+            ahead = (seq - self.next_seq) % SEQ_MODULO
+            behind = SEQ_MODULO - ahead
+            if seq == 0 or min(ahead, behind) > max(MAX_CONCEALED, LATE_WINDOW):
+                pass  # Client restarted its sequence: resync without filling
+            elif behind <= LATE_WINDOW:
+                # Late or duplicate frame, already concealed
+                return None
+            elif ahead <= MAX_CONCEALED:
+                self._conceal(ahead)
+        self.next_seq = (seq + 1) % SEQ_MODULO
+
+        if len(payload):
+            self.buffer += self._decode(payload)
+
+        if flags & FLAG_END_OF_UTTERANCE or len(self.buffer) >= self.max_bytes:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Return buffered PCM and start a new utterance"""
+        if not self.buffer:
+            return None
+        pcm = bytes(self.buffer)
+        self.buffer.clear()
+        return pcm
+
+
+class AudioTransport:
+    """Per-speaker stream registry for the audio_chunk socket event"""
+
+    def __init__(self, max_seconds=10):
+        self.max_seconds = max_seconds
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def open(self, sid, offered_codecs=None, frame_ms=20):
+        """Negotiate a codec for sid. Returns the session config or None.
+
+        Raises ValueError if frame_ms is not an Opus frame size.
+        """
+        codec = negotiate_codec(offered_codecs)
+        if codec is None:
+            return None
+
+        stream = SpeakerStream(codec, frame_ms, self.max_seconds)
+        with self._lock:
+            self._streams[sid] = stream
+
+        return {
+            "codec": codec,
+            "sample_rate": SAMPLE_RATE,
+            "channels": CHANNELS,
+            "frame_ms": stream.frame_ms
+        }
+
+    def get(self, sid):
+        with self._lock:
+            return self._streams.get(sid)
+
+    def feed(self, sid, frame):
+        """Decode a frame for sid. Returns finished utterance PCM or None."""
+        stream = self.get(sid)
+        if stream is None:
+            raise KeyError(sid)
+        return stream.push(frame)
+
+    def close(self, sid):
+        """Drop sid's stream and return any PCM still buffered"""
+        with self._lock:
+            stream = self._streams.pop(sid, None)
+        return stream.flush() if stream else None
@@ -0,0 +1,105 @@
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # test modules skip themselves via importorskip
+
+# The modules under test live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RATE = 16000  # audio_normalize.CANONICAL_RATE
+LENGTHS = [1, 10, 60]  # seconds
+LAYOUTS = {"mono": 1, "stereo": 2}
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark(group): pytest-benchmark grouping")
+
+
+def synthetic_speech(seconds, channels=1, rate=RATE, seed=0):
+    """Float32 audio shaped like speech: ~200 ms voiced bursts, pauses, a noise floor"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * rate)
+    t = np.arange(n, dtype=np.float32) / rate
+    # Voicing: a 140 Hz harmonic stack switched on and off every few syllables
+    voice = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 6)).astype(np.float32)
+    syllables = rng.random(n // (rate // 5) + 1) < 0.6
+    gate = np.repeat(syllables, rate // 5)[:n].astype(np.float32)
+    audio = 0.3 * voice * gate + rng.normal(0, 0.003, n).astype(np.float32)
+    if channels > 1:
+        # Slightly different channels so downmixing does real work
+        audio = np.stack([audio * (1 - 0.1 * c) for c in range(channels)], axis=1)
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+@pytest.fixture(params=LENGTHS, ids=lambda s: f"{s}s")
+def seconds(request):
+    return request.param
+
+
+@pytest.fixture(params=list(LAYOUTS), ids=str)
+def layout(request):
+    return LAYOUTS[request.param]
+
+
+@pytest.fixture
+def audio(seconds, layout):
+    return synthetic_speech(seconds, layout)
+
+
+@pytest.fixture
+def wav_file(tmp_path, seconds, layout):
+    sf = pytest.importorskip("soundfile")
+    path = tmp_path / "take.wav"
+    sf.write(str(path), synthetic_speech(seconds, layout), RATE, subtype="PCM_16")
+    return str(path)
+
+
+def _peak_allocation(func, *args, **kwargs):
+    """(result, peak bytes allocated while func ran), NumPy buffers included"""
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+@pytest.fixture
+def peak_allocation(benchmark):
+    """Measure a call's peak allocation and attach it to the benchmark report"""
+    def measure(func, *args, **kwargs):
+        result, peak = _peak_allocation(func, *args, **kwargs)
+        benchmark.extra_info["peak_bytes"] = peak
+        return result, peak
+    return measure
+
+
+class _Benchmark:
+    """Stand-in for pytest-benchmark's fixture: runs once, so the
+    allocation checks still run when only the audio libraries are installed"""
+
+    def __init__(self):
+        self.extra_info = {}
+
+    def __call__(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def pedantic(self, func, args=(), kwargs=None, setup=None, rounds=1, **_):
+        if setup is not None:
+            args, kwargs = setup()
+        return func(*args, **(kwargs or {}))
+
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    @pytest.fixture
+    def benchmark():
+        return _Benchmark()
@@ -0,0 +1,195 @@
+"""Timing and allocation benchmarks for the audio DSP hot paths.
+
+Run with pytest-benchmark installed to get timings (and compare against a
+saved baseline with --benchmark-autosave / --benchmark-compare-fail).
+Without it every stage runs once and only the allocation budgets are
+checked, which is enough to catch an in-place path that starts copying.
+"""
+import glob
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+pytest.importorskip("soundfile")
+
+import audio_dsp
+import audio_normalize
+from audio_mixer import mix_ducked
+from voice_features import analyze
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLED = sorted(glob.glob(os.path.join(ROOT, "voice_samples", "*.wav"))) + [os.path.join(ROOT, "jasim_voice.wav")]
+
+# Allocation allowed for work that should not touch the audio buffers:
+# Python objects, small temporaries, ufunc iteration buffers
+OVERHEAD = 256 * 1024
+
+
+def fresh(audio):
+    """pedantic() setup that hands each round its own copy"""
+    return lambda: ((audio.copy(),), {})
+
+
+def mono_length(audio):
+    return audio.shape[0]
+
+
+# normalize: scale to the file peak
+
+@pytest.mark.benchmark(group="normalize")
+def test_normalize_in_place(benchmark, audio, peak_allocation):
+    peak = float(np.max(np.abs(audio)))
+    benchmark.pedantic(lambda a: audio_dsp.normalize(a, peak, out=a), setup=fresh(audio), rounds=20)
+    work = audio.copy()
+    _, allocated = peak_allocation(audio_dsp.normalize, work, peak, out=work)
+    assert allocated < OVERHEAD
+
+
+@pytest.mark.benchmark(group="normalize")
+def test_normalize_allocating(benchmark, audio, peak_allocation):
+    peak = float(np.max(np.abs(audio)))
+    benchmark(audio_dsp.normalize, audio, peak)
+    _, allocated = peak_allocation(audio_dsp.normalize, audio, peak)
+    assert allocated >= audio.nbytes
+
+
+# compress: log compression
+
+@pytest.mark.benchmark(group="compress")
+def test_compress_in_place(benchmark, audio, peak_allocation):
+    benchmark.pedantic(lambda a: audio_dsp.compress(a, out=a), setup=fresh(audio), rounds=20)
+    work = audio.copy()
+    _, allocated = peak_allocation(audio_dsp.compress, work, out=work)
+    # Only the sign mask: one byte per sample
+    assert allocated < audio.size + OVERHEAD
+
+
+@pytest.mark.benchmark(group="compress")
+def test_compress_allocating(benchmark, audio, peak_allocation):
+    benchmark(audio_dsp.compress, audio)
+    _, allocated = peak_allocation(audio_dsp.compress, audio)
+    assert allocated >= audio.nbytes
+
+
+# Framing, silence removal and VAD
+
+@pytest.mark.benchmark(group="frame_rms")
+def test_frame_rms(benchmark, audio, peak_allocation):
+    frame_length = audio_normalize.CANONICAL_RATE * audio_dsp.FRAME_MS // 1000
+    benchmark(audio_dsp.frame_rms, audio, frame_length)
+    _, allocated = peak_allocation(audio_dsp.frame_rms, audio, frame_length)
+    # A padded mono copy (plus the downmix for multichannel input)
+    mono_bytes = mono_length(audio) * audio.itemsize
+    assert allocated < (2 if audio.ndim > 1 else 1) * mono_bytes + OVERHEAD
+
+
+@pytest.mark.benchmark(group="silence")
+def test_silence_remover(benchmark, audio):
+    blocksize = audio_dsp.BLOCK_SIZE - audio_dsp.BLOCK_SIZE % 320
+
+    def run():
+        remover = audio_dsp.SilenceRemover(audio_normalize.CANONICAL_RATE)
+        kept = 0
+        for start in range(0, len(audio), blocksize):
+            kept += sum(len(chunk) for chunk in remover.process(audio[start:start + blocksize]))
+        return kept
+
+    kept = benchmark(run)
+    assert 0 < kept < len(audio)
+
+
+def _block_budget(layout):
+    # Each stage holds a few blocks at most, never the whole file
+    return 8 * audio_dsp.BLOCK_SIZE * layout * 4 + OVERHEAD
+
+
+@pytest.mark.benchmark(group="process_file")
+def test_process_file(benchmark, wav_file, tmp_path, layout, peak_allocation):
+    out_path = str(tmp_path / "clean.wav")
+    benchmark(audio_dsp.process_file, wav_file, out_path)
+    (seconds_in, seconds_out), allocated = peak_allocation(audio_dsp.process_file, wav_file, out_path)
+    assert 0 < seconds_out < seconds_in
+    assert allocated < _block_budget(layout)
+
+
+@pytest.mark.benchmark(group="vad")
+def test_detect_utterances(benchmark, wav_file, layout, peak_allocation):
+    def run():
+        return list(audio_dsp.detect_utterances(wav_file, min_length=0.2))
+
+    benchmark(run)
+    _, allocated = peak_allocation(run)
+    assert allocated < _block_budget(layout)
+
+
+@pytest.mark.parametrize("path", BUNDLED, ids=os.path.basename)
+def test_process_file_trims_bundled_recordings(path, tmp_path):
+    # Each bundled recording has at least half a second of leading,
+    # trailing or long internal silence
+    seconds_in, seconds_out = audio_dsp.process_file(path, str(tmp_path / "clean.wav"))
+    assert seconds_in - seconds_out > 0.5
+
+
+# Format conversion and resampling
+
+@pytest.mark.benchmark(group="pcm")
+def test_to_float32(benchmark, audio, peak_allocation):
+    pcm = audio_normalize.to_pcm16(audio)
+    result = benchmark(audio_normalize.to_float32, pcm)
+    _, allocated = peak_allocation(audio_normalize.to_float32, pcm)
+    assert result.ndim == 1
+    # Downmix (multichannel) then one float32 output
+    assert allocated < (3 if audio.ndim > 1 else 2) * mono_length(audio) * 4 + OVERHEAD
+
+
+@pytest.mark.benchmark(group="pcm")
+def test_to_float32_passthrough(benchmark, audio, peak_allocation):
+    mono = np.ascontiguousarray(audio if audio.ndim == 1 else audio[:, 0])
+    benchmark(audio_normalize.to_float32, mono)
+    result, allocated = peak_allocation(audio_normalize.to_float32, mono)
+    # Already float32: returned as is, no copy
+    assert result is mono
+    assert allocated < OVERHEAD
+
+
+@pytest.mark.benchmark(group="pcm")
+def test_to_pcm16(benchmark, audio):
+    benchmark(audio_normalize.to_pcm16, audio)
+
+
+@pytest.mark.parametrize("target_rate", [8000, 48000], ids=lambda r: f"to{r // 1000}k")
+@pytest.mark.benchmark(group="resample")
+def test_resample_cached_filter(benchmark, audio, target_rate):
+    audio_normalize.resample(audio, audio_normalize.CANONICAL_RATE, target_rate)
+    result = benchmark(audio_normalize.resample, audio, audio_normalize.CANONICAL_RATE, target_rate)
+    assert len(result) == -(-len(audio) * target_rate // audio_normalize.CANONICAL_RATE)
+    assert result.dtype == np.float32
+
+
+@pytest.mark.parametrize("target_rate", [8000, 48000], ids=lambda r: f"to{r // 1000}k")
+@pytest.mark.benchmark(group="resample")
+def test_resample_cold_filter(benchmark, audio, target_rate):
+    def setup():
+        audio_normalize._filter.cache_clear()
+        return (audio, audio_normalize.CANONICAL_RATE, target_rate), {}
+
+    benchmark.pedantic(audio_normalize.resample, setup=setup, rounds=10)
+
+
+# Downstream consumers
+
+@pytest.mark.benchmark(group="mix")
+def test_mix_ducked(benchmark, audio):
+    mono = audio if audio.ndim == 1 else audio[:, 0]
+    original = audio_normalize.to_pcm16(mono)
+    translated = original[: len(original) // 2]
+    mixed = benchmark(mix_ducked, translated, original)
+    assert len(mixed) == len(original) * 2
+
+
+@pytest.mark.benchmark(group="features")
+def test_analyze(benchmark, audio):
+    features = benchmark(analyze, audio, audio_normalize.CANONICAL_RATE)
+    assert features["voiced_ratio"] > 0
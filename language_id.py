@@ -0,0 +1,273 @@
+import threading
+import concurrent.futures
+from collections import OrderedDict
+
+# Recognizer locale used for each source language unless a pair names one
+LOCALES = {
+    "bn": "bn-BD", "en": "en-US", "hi": "hi-IN", "ur": "ur-PK", "ar": "ar-SA",
+    "es": "es-ES", "fr": "fr-FR", "de": "de-DE", "zh-cn": "zh-CN", "ja": "ja-JP",
+}
+
+NAMES = {
+    "bn": "Bengali", "en": "English", "hi": "Hindi", "ur": "Urdu", "ar": "Arabic",
+    "es": "Spanish", "fr": "French", "de": "German", "zh-cn": "Chinese", "ja": "Japanese",
+}
+
+# Unicode blocks each language is written in, for checking probe transcripts
+_LATIN = [(0x41, 0x5A), (0x61, 0x7A), (0xC0, 0x24F)]
+_ARABIC = [(0x0600, 0x06FF), (0x0750, 0x077F)]
+_HAN = [(0x4E00, 0x9FFF)]
+SCRIPTS = {
+    "bn": [(0x0980, 0x09FF)], "hi": [(0x0900, 0x097F)], "ur": _ARABIC, "ar": _ARABIC,
+    "en": _LATIN, "es": _LATIN, "fr": _LATIN, "de": _LATIN,
+    "zh-cn": _HAN, "ja": [(0x3040, 0x30FF)] + _HAN,
+}
+
+DEFAULT_PAIRS = "bn:en"
+LID_SECONDS = 0.6        # audio used to identify the language
+CONFIDENT_PRIOR = 0.85   # skip identification when a speaker's prior is this sure
+REIDENTIFY_EVERY = 5     # but still identify at least every Nth utterance
+MIN_TEXT_LETTERS = 3     # shorter transcripts suggest the wrong recognizer locale
+MATCHING_SCRIPT = 0.5    # share of a transcript expected in the language's script
+MIN_LIKELIHOOD = 0.05    # floor so one bad probe can't veto a language
+
+
+def language_name(lang):
+    return NAMES.get(lang, lang)
+
+
+def parse_pairs(spec):
+    """Parse "bn:en,en:bn" (or "bn-IN:en") into an ordered {source: (locale, target)}"""
+    pairs = OrderedDict()
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        source, sep, target = item.partition(":")
+        if not sep or not target:
+            raise ValueError(f"Language pair must look like src:dest, got {item!r}")
+        if "-" in source and source.lower() not in LOCALES:
+            lang, locale = source.split("-")[0].lower(), source
+        else:
+            lang, locale = source.lower(), LOCALES.get(source.lower(), source)
+        pairs[lang] = (locale, target.lower())
+    if not pairs:
+        raise ValueError("At least one language pair is required")
+    return pairs
+
+
+def add_arguments(parser):
+    parser.add_argument("--pairs", default=DEFAULT_PAIRS,
+                        help="source:target pairs, e.g. bn:en,en:bn; several sources enable language detection")
+
+
+def script_score(text, lang):
+    """Share of the letters in text written in lang's script"""
+    ranges = SCRIPTS.get(lang)
+    letters = [ord(c) for c in text if c.isalpha()]
+    if not ranges or not letters:
+        return 0.0
+    return sum(any(lo <= c <= hi for lo, hi in ranges) for c in letters) / len(letters)
+
+
+def head(audio, seconds):
+    """The first seconds of an sr.AudioData"""
+    import speech_recognition as sr
+    length = int(audio.sample_rate * seconds) * audio.sample_width
+    return sr.AudioData(audio.frame_data[:length], audio.sample_rate, audio.sample_width)
+
+
+class SpeakerPrior:
+    """Decayed per-speaker language counts, kept for the most recent speakers"""
+
+    def __init__(self, languages, decay=0.9, max_speakers=1000):
+        self.languages = list(languages)
+        self.decay = decay
+        self.max_speakers = max_speakers
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def distribution(self, speaker):
+        with self._lock:
+            counts = self._counts.get(speaker)
+            if counts is None:
+                return {lang: 1.0 / len(self.languages) for lang in self.languages}
+            self._counts.move_to_end(speaker)
+            # Add-one smoothing keeps every configured language possible
+            total = sum(counts.values()) + len(self.languages)
+            return {lang: (counts.get(lang, 0) + 1) / total for lang in self.languages}
+
+    def update(self, speaker, lang):
+        with self._lock:
+            counts = self._counts.pop(speaker, {})
+            counts = {l: c * self.decay for l, c in counts.items()}
+            counts[lang] = counts.get(lang, 0) + 1
+            self._counts[speaker] = counts
+            if len(self._counts) > self.max_speakers:
+                self._counts.popitem(last=False)
+
+
+class LanguageIdentifier:
+    """Spoken-language likelihoods from the first LID_SECONDS of an utterance.
+
+    Uses the VoxLingua107 classifier when speechbrain is installed (loaded
+    on first use). Otherwise the short head of the clip is recognized once
+    per candidate locale in parallel and each transcript is scored by how
+    much of it is in that language's script. Either way only a fraction of
+    a second is processed, never the full utterance.
+    """
+
+    def __init__(self, pairs, recognize=None, seconds=LID_SECONDS, backend="auto"):
+        self.pairs = pairs
+        self.recognize = recognize
+        self.seconds = seconds
+        self.backend = backend
+        self.classifier = None
+        self._labels = None
+        self._lock = threading.Lock()
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=len(pairs),
+                                                           thread_name_prefix="lid")
+
+    def _load_classifier(self):
+        with self._lock:
+            if self.classifier is None:
+                from speechbrain.pretrained import EncoderClassifier
+                self.classifier = EncoderClassifier.from_hparams(source="speechbrain/lang-id-voxlingua107-ecapa")
+                encoder = self.classifier.hparams.label_encoder
+                # Labels look like "bn: Bengali"
+                self._labels = {encoder.ind2lab[i].split(":")[0]: i for i in encoder.ind2lab}
+        return self.classifier
+
+    def _classify_model(self, clip):
+        import torch
+        from audio_normalize import to_canonical
+        classifier = self._load_classifier()
+        samples = to_canonical(clip.get_raw_data(convert_width=2), clip.sample_rate)
+        log_probs = classifier.classify_batch(torch.from_numpy(samples).unsqueeze(0))[0][0]
+        probs = log_probs.exp()
+        return {lang: float(probs[self._labels[lang.split("-")[0]]]) if lang.split("-")[0] in self._labels else 0.0
+                for lang in self.pairs}
+
+    def _classify_probe(self, clip):
+        import speech_recognition as sr
+
+        def probe(lang):
+            try:
+                return script_score(self.recognize(clip, self.pairs[lang][0]), lang)
+            except sr.UnknownValueError:
+                return 0.0
+
+        futures = {lang: self._pool.submit(probe, lang) for lang in self.pairs}
+        scores = {}
+        for lang, future in futures.items():
+            try:
+                scores[lang] = future.result()
+            except Exception as e:
+                print(f"Language probe failed for {lang}: {e}")
+                scores[lang] = 0.0
+        return scores
+
+    def classify(self, audio):
+        """{language: likelihood} for the configured source languages"""
+        clip = head(audio, self.seconds)
+        scores = None
+        if self.backend in ("auto", "model"):
+            try:
+                scores = self._classify_model(clip)
+            except ImportError:
+                if self.backend == "model":
+                    raise
+                self.backend = "probe"  # Don't retry the import on every utterance
+        if scores is None:
+            scores = self._classify_probe(clip)
+        return {lang: max(score, MIN_LIKELIHOOD) for lang, score in scores.items()}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+class LanguageRouter:
+    """Decide an utterance's source language, recognizer locale and target.
+
+    With one configured pair this is free. With several, a speaker whose
+    recent utterances were confidently one language is routed from the
+    cached prior alone; otherwise the prior is combined with a quick
+    identification of the first fraction of a second of audio. The full
+    utterance is then recognized once, with the chosen locale.
+
+    Only identified labels feed the prior, and a confident speaker is
+    still identified every reidentify_every utterances or right after a
+    transcript that looks wrong for its language, so a second speaker on
+    a shared key (or a switch of language) is noticed.
+    """
+
+    def __init__(self, pairs, recognize=None, confident=CONFIDENT_PRIOR, lid_backend="auto",
+                 reidentify_every=REIDENTIFY_EVERY):
+        if isinstance(pairs, str):
+            pairs = parse_pairs(pairs)
+        self.pairs = pairs
+        self.confident = confident
+        self.reidentify_every = reidentify_every
+        self.prior = SpeakerPrior(pairs)
+        self.identifier = LanguageIdentifier(pairs, recognize, backend=lid_backend) if len(pairs) > 1 else None
+        # speaker -> [utterances routed from the prior alone, identified label awaiting confirm]
+        self._speakers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, speaker):
+        state = self._speakers.pop(speaker, None) or [0, None]
+        self._speakers[speaker] = state
+        if len(self._speakers) > self.prior.max_speakers:
+            self._speakers.popitem(last=False)
+        return state
+
+    @property
+    def sources(self):
+        return list(self.pairs)
+
+    def route(self, audio, speaker=None):
+        """(source language, recognizer locale, target language) for audio"""
+        if self.identifier is None:
+            lang = self.sources[0]
+        else:
+            prior = self.prior.distribution(speaker)
+            lang = max(prior, key=prior.get)
+            with self._lock:
+                state = self._state(speaker)
+                identify = prior[lang] < self.confident or state[0] + 1 >= self.reidentify_every
+                state[0] = 0 if identify else state[0] + 1
+                state[1] = None
+            if identify:
+                likelihood = self.identifier.classify(audio)
+                posterior = {l: prior[l] * likelihood.get(l, MIN_LIKELIHOOD) for l in prior}
+                lang = max(posterior, key=posterior.get)
+                with self._lock:
+                    self._state(speaker)[1] = lang
+        locale, target = self.pairs[lang]
+        return lang, locale, target
+
+    def confirm(self, speaker, lang, text):
+        """Report the transcript of speaker's utterance routed as lang (None if unrecognized).
+
+        The prior only learns from labels that came from identification; a
+        missing or implausible transcript makes the next utterance identify.
+        """
+        if self.identifier is None:
+            return
+        letters = [c for c in text or "" if c.isalpha()]
+        plausible = len(letters) >= MIN_TEXT_LETTERS and (
+            lang not in SCRIPTS or script_score(text, lang) >= MATCHING_SCRIPT)
+        with self._lock:
+            state = self._state(speaker)
+            identified, state[1] = state[1], None
+            if not plausible:
+                state[0] = self.reidentify_every
+        if plausible and identified == lang:
+            self.prior.update(speaker, lang)
+
+    def describe(self):
+        return ", ".join(f"{language_name(src)} -> {language_name(dest)}" for src, (_, dest) in self.pairs.items())
+
+    def shutdown(self):
+        if self.identifier is not None:
+            self.identifier.shutdown()
@@ -0,0 +1,327 @@
+import os
+import sys
+import glob
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+from collections import deque, defaultdict
+
+from audio_normalize import load, to_pcm16
+from audio_transport import encode_frame, CODEC_PCM16, SAMPLE_RATE, SAMPLE_WIDTH
+
+DEFAULT_URL = "http://localhost:3000"
+DEFAULT_SAMPLES = "voice_samples/*.wav"
+FRAME_MS = 20
+PENDING_TIMEOUT = 30  # seconds before an unanswered utterance counts as lost
+
+
+def load_utterances(pattern):
+    """Every matching WAV as 16 kHz mono PCM bytes"""
+    utterances = [to_pcm16(load(path, SAMPLE_RATE)).tobytes() for path in sorted(glob.glob(pattern))]
+    if not utterances:
+        raise SystemExit(f"No audio files match {pattern}")
+    return utterances
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def process_stats(pid):
+    """(threads, RSS in MB) of a process, or (None, None) if unavailable"""
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        return process.num_threads(), process.memory_info().rss / 2 ** 20
+    except ImportError:
+        pass
+    except Exception:
+        return None, None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["Threads"]), int(fields["VmRSS"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+class Stats:
+    """Counters shared by every simulated client (all on one event loop)"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.connected = 0
+        self.errors = 0
+        self.utterances = 0
+        self.frames = 0
+        self.translations = 0   # measured by one listener per room and language
+        self.deliveries = 0     # every translated_audio received by any client
+        self.lost = 0
+        self.late_frames = 0    # frames sent behind schedule (generator overloaded)
+        self.latencies = []
+        self.window = []
+        self.pending = defaultdict(deque)  # (speaker sid, language) -> end-of-utterance times
+
+    def utterance_sent(self, sid, languages):
+        now = time.monotonic()
+        self.utterances += 1
+        for language in languages:
+            self.pending[(sid, language)].append(now)
+
+    def translation_received(self, sender, language):
+        pending = self.pending.get((sender, language))
+        now = time.monotonic()
+        while pending and now - pending[0] > PENDING_TIMEOUT:
+            pending.popleft()
+            self.lost += 1
+        if pending:
+            latency = now - pending.popleft()
+            self.translations += 1
+            self.latencies.append(latency)
+            self.window.append(latency)
+
+    def take_window(self):
+        window, self.window = self.window, []
+        return window
+
+
+class SimulatedSpeaker:
+    """One Socket.IO participant: joins a room, talks, and listens"""
+
+    def __init__(self, url, room, language, room_languages, probe, stats, utterances, pause, frame_ms):
+        import socketio
+        self.url = url
+        self.room = room
+        self.language = language
+        self.room_languages = room_languages
+        self.probe = probe
+        self.stats = stats
+        self.utterances = utterances
+        self.pause = pause
+        self.frame_ms = frame_ms
+        self.configured = asyncio.Event()
+        self.seq = 0  # frame sequence numbers run on across utterances
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on("audio_config", self._on_audio_config)
+        self.sio.on("translated_audio", self._on_translated_audio)
+
+    async def _on_audio_config(self, data):
+        if "error" in data:
+            self.stats.errors += 1
+        self.configured.set()
+
+    async def _on_translated_audio(self, data):
+        self.stats.deliveries += 1
+        if self.probe:
+            self.stats.translation_received(data.get("sender"), data.get("lang"))
+
+    async def connect(self):
+        await self.sio.connect(self.url)
+        # call() waits for the server, so the room exists before any audio
+        await self.sio.call("join_room", {"room": self.room, "language": self.language})
+        await self.sio.call("audio_config", {"codecs": [CODEC_PCM16], "frame_ms": self.frame_ms})
+        await asyncio.wait_for(self.configured.wait(), timeout=10)
+        self.stats.connected += 1
+
+    async def speak(self, pcm):
+        """Stream one utterance in frames at real-time pace"""
+        frame_bytes = SAMPLE_RATE * SAMPLE_WIDTH * self.frame_ms // 1000
+        frames = [pcm[i:i + frame_bytes] for i in range(0, len(pcm), frame_bytes)]
+        start = time.monotonic()
+        for i, payload in enumerate(frames):
+            # Absolute schedule so slow sends don't stretch the utterance
+            delay = start + i * self.frame_ms / 1000 - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -self.frame_ms / 1000:
+                self.stats.late_frames += 1
+            end = i == len(frames) - 1
+            await self.sio.emit("audio_chunk", {"room": self.room, "chunk": encode_frame(self.seq, payload, end)})
+            self.seq += 1
+            self.stats.frames += 1
+        # Servers echo the namespace sid as the sender
+        self.stats.utterance_sent(self.sio.get_sid(), self.room_languages)
+
+    async def run(self, stop):
+        try:
+            await self.connect()
+            while not stop.is_set():
+                await asyncio.sleep(random.uniform(*self.pause))
+                if stop.is_set():
+                    break
+                await self.speak(random.choice(self.utterances))
+        except Exception as e:
+            self.stats.errors += 1
+            print(f"{self.room}/{self.language}: {e}")
+        finally:
+            if self.sio.connected:
+                await self.sio.disconnect()
+
+
+async def report(stats, interval, pid, timeline, stop):
+    previous = (time.monotonic(), 0, 0, 0)
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        now = time.monotonic()
+        elapsed = now - previous[0]
+        window = stats.take_window()
+        threads, rss = process_stats(pid) if pid else (None, None)
+        point = {
+            "t": round(now - stats.started, 1),
+            "clients": stats.connected,
+            "utterances_per_s": round((stats.utterances - previous[1]) / elapsed, 2),
+            "translations_per_s": round((stats.translations - previous[2]) / elapsed, 2),
+            "deliveries_per_s": round((stats.deliveries - previous[3]) / elapsed, 2),
+            "p50": percentile(window, 50),
+            "p95": percentile(window, 95),
+            "p99": percentile(window, 99),
+            "server_threads": threads,
+            "server_rss_mb": round(rss, 1) if rss is not None else None,
+            "late_frames": stats.late_frames,
+            "lost": stats.lost,
+            "errors": stats.errors,
+        }
+        timeline.append(point)
+        previous = (now, stats.utterances, stats.translations, stats.deliveries)
+
+        def ms(value):
+            return f"{value * 1000:6.0f}" if value is not None else "     -"
+        print(f"{point['t']:7.1f}s clients {point['clients']:4d} | utt/s {point['utterances_per_s']:6.2f} "
+              f"tr/s {point['translations_per_s']:6.2f} | p50 {ms(point['p50'])} p95 {ms(point['p95'])} "
+              f"p99 {ms(point['p99'])} ms | threads {threads if threads is not None else '-'} "
+              f"rss {point['server_rss_mb'] if rss is not None else '-'} MB")
+
+
+async def run(args, pid):
+    utterances = load_utterances(args.samples)
+    languages = [l.strip() for l in args.languages.split(",") if l.strip()]
+    stats = Stats()
+    stop = asyncio.Event()
+
+    speakers = []
+    for r in range(args.rooms):
+        room = f"load-{r}"
+        # Rotate the language mix so rooms differ
+        assigned = [languages[(r + s) % len(languages)] for s in range(args.speakers)]
+        room_languages = sorted(set(assigned))
+        probes = set()
+        for language in assigned:
+            probe = language not in probes
+            probes.add(language)
+            speakers.append(SimulatedSpeaker(args.url, room, language, room_languages, probe, stats,
+                                             utterances, args.pause, args.frame_ms))
+
+    timeline = []
+    reporter = asyncio.ensure_future(report(stats, args.interval, pid, timeline, stop))
+    tasks = []
+    for i, speaker in enumerate(speakers):
+        tasks.append(asyncio.ensure_future(speaker.run(stop)))
+        # Spread connections over the ramp-up period
+        await asyncio.sleep(args.ramp / len(speakers))
+
+    await asyncio.sleep(max(0, args.duration - args.ramp))
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await reporter
+
+    elapsed = time.monotonic() - stats.started
+    summary = {
+        "rooms": args.rooms,
+        "speakers_per_room": args.speakers,
+        "duration_s": round(elapsed, 1),
+        "utterances": stats.utterances,
+        "translations": stats.translations,
+        "deliveries": stats.deliveries,
+        "throughput_translations_per_s": round(stats.translations / elapsed, 2),
+        "latency_p50_ms": round(percentile(stats.latencies, 50) * 1000) if stats.latencies else None,
+        "latency_p90_ms": round(percentile(stats.latencies, 90) * 1000) if stats.latencies else None,
+        "latency_p99_ms": round(percentile(stats.latencies, 99) * 1000) if stats.latencies else None,
+        "latency_max_ms": round(max(stats.latencies) * 1000) if stats.latencies else None,
+        "unanswered": stats.lost + sum(len(p) for p in stats.pending.values()),
+        "late_frames": stats.late_frames,
+        "errors": stats.errors,
+        "peak_server_threads": max((p["server_threads"] for p in timeline if p["server_threads"]), default=None),
+        "peak_server_rss_mb": max((p["server_rss_mb"] for p in timeline if p["server_rss_mb"]), default=None),
+    }
+    print("\nSummary")
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
+    if stats.late_frames:
+        print("  (late frames mean the load generator itself fell behind; run fewer clients per process)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "timeline": timeline}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+def spawn_server(port, latency_scale):
+    """Start app1.py with stubbed backends and wait for it to accept connections"""
+    env = dict(os.environ, APP1_STUB_BACKENDS="1", PORT=str(port), STUB_LATENCY_SCALE=str(latency_scale))
+    server = subprocess.Popen([sys.executable, "app1.py"], env=env,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("app1.py exited during startup")
+        try:
+            socket.create_connection(("localhost", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise SystemExit("app1.py did not start listening in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capacity test for app1.py with simulated rooms and speakers")
+    parser.add_argument("--url", default=DEFAULT_URL, help="server to test (ignored with --spawn)")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start app1.py locally with stubbed recognizer, translator and TTS")
+    parser.add_argument("--port", type=int, default=3100, help="port for --spawn")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="stub backend delay multiplier for --spawn (0 = no delay)")
+    parser.add_argument("--server-pid", type=int, help="pid to sample threads and memory from")
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--speakers", type=int, default=6, help="speakers per room")
+    parser.add_argument("--languages", default="en,bn,hi,es", help="languages assigned round-robin")
+    parser.add_argument("--samples", default=DEFAULT_SAMPLES, help="glob of WAV files to stream")
+    parser.add_argument("--pause", type=float, nargs=2, default=(2.0, 6.0), metavar=("MIN", "MAX"),
+                        help="seconds of silence between a speaker's utterances")
+    parser.add_argument("--frame-ms", type=int, default=FRAME_MS)
+    parser.add_argument("--duration", type=float, default=120, help="seconds, including ramp-up")
+    parser.add_argument("--ramp", type=float, default=10, help="seconds to connect all clients")
+    parser.add_argument("--interval", type=float, default=5, help="seconds between report lines")
+    parser.add_argument("--json", help="also write the summary and timeline to this file")
+    args = parser.parse_args()
+
+    server = None
+    pid = args.server_pid
+    if args.spawn:
+        server = spawn_server(args.port, args.latency_scale)
+        args.url = f"http://localhost:{args.port}"
+        pid = server.pid
+    print(f"Testing {args.url}: {args.rooms} rooms x {args.speakers} speakers for {args.duration:.0f}s")
+
+    try:
+        asyncio.run(run(args, pid))
+    except KeyboardInterrupt:
+        print("\nInterrupted")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
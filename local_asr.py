@@ -0,0 +1,46 @@
+import threading
+
+# Same checkpoint main1.py uses for offline recognition
+WAV2VEC2_MODEL = "facebook/wav2vec2-large-xlsr-53"
+WAV2VEC2_RATE = 16000
+
+
+class Wav2Vec2Recognizer:
+    """Offline recognizer used when the remote backend is degraded.
+
+    transformers/torch are imported and the model is loaded on first use,
+    so having this as a fallback costs nothing until it is needed.
+    """
+
+    def __init__(self, model_name=WAV2VEC2_MODEL):
+        self.model_name = model_name
+        self.processor = None
+        self.model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self.model is None:
+                from transformers import Wav2Vec2ForCTC, Wav2Vec2Processor
+                self.processor = Wav2Vec2Processor.from_pretrained(self.model_name)
+                self.model = Wav2Vec2ForCTC.from_pretrained(self.model_name)
+
+    def recognize(self, audio_data, language=None):
+        """Transcribe an sr.AudioData; language is fixed by the checkpoint"""
+        import torch
+        import speech_recognition as sr
+        from audio_normalize import to_canonical
+
+        self._load()
+        pcm = audio_data.get_raw_data(convert_width=2)
+        audio = to_canonical(pcm, audio_data.sample_rate, WAV2VEC2_RATE)
+
+        input_values = self.processor(audio, return_tensors="pt", sampling_rate=WAV2VEC2_RATE).input_values
+        with torch.no_grad():
+            logits = self.model(input_values).logits
+        predicted_ids = torch.argmax(logits, dim=-1)
+        text = self.processor.batch_decode(predicted_ids)[0].strip()
+
+        if not text:
+            raise sr.UnknownValueError()
+        return text
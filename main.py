@@ -1,16 +1,15 @@
 import time
 import threading
-import tempfile
 import os
 import sys
+import argparse
 import speech_recognition as sr
 from googletrans import Translator
 from gtts import gTTS
 from playsound import playsound
-
-# Global flag for animation
-listening = False
-processing = False
+from language_id import LanguageRouter, DEFAULT_PAIRS, add_arguments, language_name
+from resources import temp_path, start_temp_janitor, install_memory_signal
+from status import StatusRenderer, add_arguments as add_status_arguments, from_args as status_from_args
 
 recognizer = sr.Recognizer()
 translator = Translator()
@@ -20,86 +19,73 @@ recognizer.pause_threshold = 0.5  # Shorter silence to end phrase
 recognizer.energy_threshold = 4000  # Adjust based on your microphone
 recognizer.dynamic_energy_threshold = True
 
-def animate_listening():
-    global listening
-    while listening:
-        sys.stdout.write('\rListening...   ')
-        time.sleep(0.3)
-        sys.stdout.write('\rListening..  ')
-        time.sleep(0.3)
-        sys.stdout.write('\rListening. ')
-        time.sleep(0.3)
-        sys.stdout.write('\rListening   ')
-        time.sleep(0.3)
-    sys.stdout.write('\r             \r')  # Clear line
+def _recognize(audio, locale):
+    return recognizer.recognize_google(audio, language=locale)
+
+# Routes each utterance to a source language and target (--pairs)
+router = LanguageRouter(DEFAULT_PAIRS, recognize=_recognize)
 
-def animate_processing():
-    global processing
-    chars = ['|', '/', '-', '\\']
-    i = 0
-    while processing:
-        sys.stdout.write(f'\rProcessing {chars[i]}')
-        i = (i + 1) % 4
-        time.sleep(0.1)
-    sys.stdout.write('\r             \r')  # Clear line
+# Console status line (or JSON events with --status-json), driven by
+# pipeline events rather than polled flags
+status = StatusRenderer()
 
 def speak_text_gtts(text, lang='en'):
     try:
         tts = gTTS(text=text, lang=lang)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-            temp_filename = fp.name
-        tts.save(temp_filename)
-        playsound(temp_filename)
-        os.remove(temp_filename)
+        temp_filename = temp_path(".mp3")
+        try:
+            tts.save(temp_filename)
+            playsound(temp_filename)
+        finally:
+            os.remove(temp_filename)
     except Exception as e:
         print("TTS error:", e)
 
 def process_audio(audio):
-    global processing
     try:
-        processing = True
-        threading.Thread(target=animate_processing).start()
+        status.set_state("processing")
+        
+        with status.stage("route"):
+            src, locale, dest = router.route(audio, "local")
         
         # Faster recognition with shorter timeout
-        bengali_text = recognizer.recognize_google(audio, language="bn-BD", show_all=False)
+        with status.stage("recognize"):
+            try:
+                source_text = recognizer.recognize_google(audio, language=locale, show_all=False)
+            except sr.UnknownValueError:
+                router.confirm("local", src, None)
+                raise
+        router.confirm("local", src, source_text)
         sys.stdout.write('\r\033[K')  # Clear current line
-        print(f"\rBengali: {bengali_text}")
+        print(f"\r{language_name(src)}: {source_text}")
+        status.post("transcript", lang=src, text=source_text)
         
-        translation = translator.translate(bengali_text, src='bn', dest='en')
-        english_text = translation.text
-        print(f"English: {english_text}\n")
+        with status.stage("translate"):
+            translation = translator.translate(source_text, src=src, dest=dest)
+        translated_text = translation.text
+        print(f"{language_name(dest)}: {translated_text}\n")
+        status.post("translation", lang=dest, text=translated_text)
         
         # Speak in separate thread to avoid blocking
-        threading.Thread(target=speak_text_gtts, args=(english_text, 'en')).start()
+        threading.Thread(target=speak_text_gtts, args=(translated_text, dest)).start()
         
     except sr.UnknownValueError:
         print("\rCould not understand audio")
     except Exception as e:
         print(f"\rError: {str(e)}")
     finally:
-        processing = False
+        # The microphone keeps listening while an utterance is processed
+        status.set_state("listening")
 
 def audio_callback(recognizer, audio):
-    global listening
-    listening = False
     threading.Thread(target=process_audio, args=(audio,)).start()
 
-# Start listening
-mic = sr.Microphone()
-with mic as source:
-    print("Calibrating microphone...")
-    recognizer.adjust_for_ambient_noise(source, duration=1)
-    print("Ready!")
-
 def start_listening():
-    global listening
+    status.set_state("listening")
     while True:
         try:
             with mic as source:
-                listening = True
-                threading.Thread(target=animate_listening).start()
                 audio = recognizer.listen(source, timeout=2, phrase_time_limit=5)
-                listening = False
                 audio_callback(recognizer, audio)
         except sr.WaitTimeoutError:
             continue
@@ -107,14 +93,33 @@ def start_listening():
             print(f"Error: {str(e)}")
             break
 
-# Start main thread
-listening_thread = threading.Thread(target=start_listening)
-listening_thread.daemon = True
-listening_thread.start()
-
-try:
-    while True: 
-        time.sleep(0.1)
-except KeyboardInterrupt:
-    print("\nExiting...")
-    sys.exit(0)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bengali to English voice translator")
+    add_arguments(parser)
+    add_status_arguments(parser)
+    args = parser.parse_args()
+    router = LanguageRouter(args.pairs, recognize=_recognize)
+    
+    # Start listening
+    mic = sr.Microphone()
+    with mic as source:
+        print("Calibrating microphone...")
+        recognizer.adjust_for_ambient_noise(source, duration=1)
+        print("Ready!")
+    
+    # One status renderer, orphaned temp files swept, SIGUSR1 dumps memory
+    status = status_from_args(args).start()
+    start_temp_janitor()
+    install_memory_signal()
+    
+    # Start main thread
+    listening_thread = threading.Thread(target=start_listening)
+    listening_thread.daemon = True
+    listening_thread.start()
+    
+    try:
+        while True: 
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        print("\nExiting...")
+        sys.exit(0)
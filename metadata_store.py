@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import threading
+
+from phrasebook import normalize_text
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+
+class MetadataStore:
+    """Voice dataset metadata kept as a snapshot plus an append-only journal.
+
+    metadata.json is the last compacted snapshot (same layout as before).
+    Every change since then is one JSON line in metadata.journal.jsonl, so
+    recording a sample appends a line instead of rewriting the whole file.
+    A torn last line from a crash is ignored on load. compact() folds the
+    journal back into the snapshot.
+    """
+
+    def __init__(self, metadata_file, sample_rate=22050):
+        self.metadata_file = metadata_file
+        self.journal_file = os.path.splitext(metadata_file)[0] + JOURNAL_SUFFIX
+        self._lock = threading.RLock()
+        self.data = {
+            "sample_count": 0,
+            "total_duration": 0,
+            "phrases": [],
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "sample_rate": sample_rate
+        }
+        self.by_id = {}
+        self.by_filename = {}
+        self.by_transcription = {}
+        self.next_id = 0
+        self._journal_offset = 0
+        self.load()
+
+    # Loading
+
+    def load(self):
+        """Read the snapshot, then replay the journal on top of it"""
+        with self._lock:
+            if os.path.exists(self.metadata_file):
+                with open(self.metadata_file, "r") as f:
+                    self.data = json.load(f)
+            else:
+                # New dataset: fix its creation time and sample rate on disk
+                self._write_snapshot()
+            self.by_id = {}
+            self.by_filename = {}
+            self.by_transcription = {}
+            self.next_id = 0
+            for phrase in self.data["phrases"]:
+                self._index(phrase)
+            self._journal_offset = 0
+            self.refresh()
+
+    def refresh(self):
+        """Apply journal lines written since the last read (e.g. by another recorder)"""
+        with self._lock:
+            if not os.path.exists(self.journal_file):
+                return
+            with open(self.journal_file, "rb") as f:
+                f.seek(self._journal_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Torn write; a later append or compaction replaces it
+                    self._journal_offset += len(line)
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        print(f"Skipping corrupt metadata journal entry at byte {self._journal_offset - len(line)}")
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "add":
+            phrase = record["phrase"]
+            if phrase["id"] in self.by_id:
+                return
+            self.data["phrases"].append(phrase)
+            self.data["sample_count"] += 1
+            self.data["total_duration"] += phrase.get("duration", 0)
+            self._index(phrase)
+        elif op == "update":
+            phrase = self.by_id.get(record["id"])
+            if phrase is None:
+                return
+            self._unindex(phrase)
+            phrase.update(record["fields"])
+            self._index(phrase)
+
+    # Indexes
+
+    def _index(self, phrase):
+        self.by_id[phrase["id"]] = phrase
+        self.next_id = max(self.next_id, phrase["id"] + 1)
+        self.by_filename[phrase["filename"]] = phrase
+        if phrase.get("transcription"):
+            key = normalize_text(phrase["transcription"])
+            self.by_transcription.setdefault(key, []).append(phrase)
+
+    def _unindex(self, phrase):
+        self.by_filename.pop(phrase["filename"], None)
+        if phrase.get("transcription"):
+            key = normalize_text(phrase["transcription"])
+            matches = [p for p in self.by_transcription.get(key, []) if p is not phrase]
+            if matches:
+                self.by_transcription[key] = matches
+            else:
+                self.by_transcription.pop(key, None)
+
+    def get(self, sample_id):
+        with self._lock:
+            return self.by_id.get(sample_id)
+
+    def find_by_filename(self, filename):
+        with self._lock:
+            return self.by_filename.get(filename)
+
+    def find_by_transcription(self, text):
+        """Samples whose transcription matches text (case and punctuation ignored)"""
+        with self._lock:
+            return list(self.by_transcription.get(normalize_text(text), []))
+
+    # Writing
+
+    def _append(self, records):
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        # O_APPEND makes each write land at the current end of file even with
+        # several recorders; one write per batch keeps lines from interleaving
+        fd = os.open(self.journal_file, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b"\n":
+                # Terminate a torn line from a crash so it can't swallow ours
+                lines = b"\n" + lines
+            os.write(fd, lines)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def claim_sample_path(self, samples_dir, pattern="sample_{:04d}.wav"):
+        """Reserve the next free sample id and create its (empty) file.
+
+        The file is created with O_EXCL, so two recorders sharing the
+        dataset never pick the same id even before either has journaled it.
+        """
+        with self._lock:
+            self.refresh()
+            while True:
+                sample_id = self.next_id
+                self.next_id += 1
+                filename = os.path.join(samples_dir, pattern.format(sample_id))
+                try:
+                    os.close(os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+                    return sample_id, filename
+                except FileExistsError:
+                    pass
+
+    def add(self, *phrases):
+        """Journal and index new samples"""
+        with self._lock:
+            records = [{"op": "add", "phrase": p} for p in phrases]
+            self._append(records)
+            # Replaying picks up our lines and any another recorder appended
+            self.refresh()
+
+    def update(self, sample_id, **fields):
+        """Journal a change to one sample's fields"""
+        self.update_many([(sample_id, fields)])
+
+    def update_many(self, changes):
+        """Journal several (sample_id, fields) changes with a single write"""
+        with self._lock:
+            records = [{"op": "update", "id": sample_id, "fields": fields} for sample_id, fields in changes]
+            if not records:
+                return
+            self._append(records)
+            # Replaying picks up our lines and any another recorder appended
+            self.refresh()
+
+    def _write_snapshot(self):
+        """Replace metadata.json atomically (temp file, fsync, rename)"""
+        tmp_file = self.metadata_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.metadata_file)
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot and start an empty journal.
+
+        Run it when no other process is recording into the same dataset.
+        """
+        with self._lock:
+            self.refresh()
+            self._write_snapshot()
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self._journal_offset = 0
+            return len(self.data["phrases"])
@@ -1,18 +1,23 @@
 import time
 import threading
-import tempfile
-import os
 import sys
 import queue
 import speech_recognition as sr
-from googletrans import Translator
-from gtts import gTTS
-from playsound import playsound
+from client_pool import speech_pool, translator_pool
+from request_policy import RequestPolicy
+from phrasebook import Phrasebook
+from speech_synthesis import PcmCache, SYNTH_RATE, synthesize
+from local_asr import Wav2Vec2Recognizer
+from language_id import LanguageRouter, DEFAULT_PAIRS, add_arguments, language_name
+from resources import install_memory_signal
+from status import StatusRenderer, add_arguments as add_status_arguments, from_args as status_from_args
+from audio_ring import AudioRing, Lease, resolve
+from speculative_tts import SpeculativeSynthesizer
+import playback
+import argparse
 import concurrent.futures
 
 # Global flags
-listening = False
-processing = False
 mic_active = True  # Control mic activation
 
 # Use a thread pool for concurrent operations
@@ -22,6 +27,10 @@ executor = concurrent.futures.ThreadPoolExecutor(max_workers=3)
 audio_queue = queue.Queue()
 text_queue = queue.Queue()
 
+# Captured utterances are written once into shared memory; workers get
+# (offset, length) slices, so moving them to a process pool costs no copies
+audio_ring = AudioRing()
+
 # Semaphore to avoid audio feedback loops
 speaking_lock = threading.Semaphore(1)
 
@@ -32,157 +41,199 @@ recognizer.energy_threshold = 4000  # Increased - better for speech detection
 recognizer.dynamic_energy_threshold = True
 recognizer.non_speaking_duration = 0.3  # Shorter silence detection
 
-# Pre-initialize translator to avoid startup delay
-translator = Translator()
+# Pre-connected keep-alive clients for recognition and translation
+recognizer_clients = speech_pool(size=3, timeout=8)
+translator_clients = translator_pool(size=3, timeout=5)
+
+def _remote_recognize(audio, language):
+    with recognizer_clients.client() as client:
+        return client.recognize(audio, language=language)
+
+def _remote_translate(text, src, dest):
+    with translator_clients.client() as client:
+        return client.translate(text, src=src, dest=dest)
 
-def animate_listening():
-    global listening
-    while listening:
-        sys.stdout.write('\rListening...   ')
-        time.sleep(0.2)  # Faster animation
-        sys.stdout.write('\rListening..  ')
-        time.sleep(0.2)
-        sys.stdout.write('\rListening. ')
-        time.sleep(0.2)
-        sys.stdout.write('\rListening   ')
-        time.sleep(0.2)
-    sys.stdout.write('\r             \r')
+# Hedge slow calls, retry with backoff and fail over to local wav2vec2
+recognition_policy = RequestPolicy("Recognition", _remote_recognize,
+                                   fallback=Wav2Vec2Recognizer().recognize,
+                                   deadline=7.5, non_retryable=(sr.UnknownValueError,))
+translation_policy = RequestPolicy("Translation", _remote_translate, deadline=4.5)
 
-def animate_processing():
-    global processing
-    chars = ['|', '/', '-', '\\']
-    i = 0
-    while processing:
-        sys.stdout.write(f'\rProcessing {chars[i]}')
-        i = (i + 1) % 4
-        time.sleep(0.1)
-    sys.stdout.write('\r             \r')
+# Source:target pairs (--pairs); with several sources the language of
+# each utterance is detected and remembered per speaker. Probes skip the
+# local wav2vec2 fallback (xlsr-53 transcribes whatever it hears,
+# ignoring the requested locale) so it can't bias detection.
+router = LanguageRouter(DEFAULT_PAIRS, recognize=_remote_recognize)
+LOCAL_SPEAKER = "local"
+
+# Console status line (or JSON events with --status-json), driven by
+# pipeline events rather than polled flags
+status = StatusRenderer()
 
 # Pre-download and cache common responses
-tts_cache = {}
+tts_cache = PcmCache(max_entries=50, max_text_length=100)
+
+# Pre-translated, pre-synthesized phrases (build with: python phrasebook.py build)
+phrasebook = Phrasebook()
+
+def render_speech(text, lang='en'):
+    """(audio, rate) for text from the phrasebook, the PCM cache or gTTS"""
+    entry = phrasebook.lookup_speech(text, lang)
+    if entry:
+        return phrasebook.pcm(entry)
+    pcm = tts_cache.get(text, lang)
+    if pcm is not None:
+        return pcm, SYNTH_RATE
 
-def speak_text_gtts(text, lang='en'):
+    # Synthesize with gTTS, decoded straight to PCM
+    pcm = synthesize(text, lang, output="pcm")
+    
+    # Cache shorter phrases (under 100 chars) as decoded PCM
+    tts_cache.put(text, lang, pcm)
+    return pcm, SYNTH_RATE
+
+# Likely translations (seen in past turns, or a known first clause) are
+# synthesized on a spare worker while the translation request is in flight
+speculator = SpeculativeSynthesizer(
+    render_speech, lookup=lambda text, src, dest: (phrasebook.lookup(text, src, dest) or {}).get('translation'))
+
+def speak_text_gtts(text, lang='en', speech=None):
     """Optimized TTS function with caching and mic pause"""
-    global listening, mic_active
+    global mic_active
     
     # Use semaphore to ensure only one speech at a time
     with speaking_lock:
+        job = None
         try:
             # Explicitly disable microphone while speaking
             mic_active = False
-            listening = False
-            
-            # Check cache first
-            if text in tts_cache:
-                playsound(tts_cache[text])
-                return
-
-            # Use lower quality for faster synthesis
-            tts = gTTS(text=text, lang=lang, slow=False)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-                temp_filename = fp.name
+            status.set_state("speaking")
             
-            tts.save(temp_filename)
-            playsound(temp_filename)
-            
-            # Cache shorter phrases (under 100 chars)
-            if len(text) < 100 and len(tts_cache) < 50:  # Limit cache size
-                tts_cache[text] = temp_filename
-            else:
-                os.remove(temp_filename)
+            # Speculatively synthesized clips; a text part is the rest of
+            # the sentence, synthesized while the clip before it plays
+            for part in speech or [text]:
+                job = playback.engine.play(*(render_speech(part, lang) if isinstance(part, str) else part))
         except Exception as e:
             print("TTS error:", e)
         finally:
-            # Wait for audio system to fully release
-            time.sleep(0.5)
+            # Keep the mic off until the last sample has actually been played
+            if job is not None:
+                playback.engine.wait_until_heard(job)
             mic_active = True  # Re-enable microphone
 
-def recognize_audio(audio):
-    """Separated function for speech recognition"""
+def recognize_audio(audio, locale="bn-BD", language="Bengali", lease=None):
+    """Separated function for speech recognition.
+
+    lease, if given, is closed once every recognition attempt (hedges and
+    retries included) has stopped reading the audio.
+    """
     try:
         # Use timeout to prevent hanging
-        print("Recognizing speech...", end="\r")
-        bengali_text = recognizer.recognize_google(audio, language="bn-BD", show_all=False)
-        print("                      ", end="\r")  # Clear the line
-        return bengali_text
+        with status.stage("recognize"):
+            return recognition_policy.execute(audio, locale, on_settled=lease.close if lease else None)
     except sr.UnknownValueError:
-        print("No Bengali speech detected.", end="\r")
+        status.post("no_speech", language=language)
         return None
     except Exception as e:
         print(f"\rRecognition error: {str(e)}")
         return None
 
-def translate_text(bengali_text):
+def translate_text(source_text, src='bn', dest='en'):
     """Separated function for translation"""
     try:
-        translation = translator.translate(bengali_text, src='bn', dest='en')
-        return translation.text
+        with status.stage("translate"):
+            return translation_policy.execute(source_text, src, dest)
     except Exception as e:
         print(f"\rTranslation error: {str(e)}")
         return None
 
-def process_audio(audio):
-    global processing, mic_active
+def process_audio(audio_slice, lease):
+    global mic_active
     try:
-        processing = True
+        audio = resolve(audio_slice)
+        status.set_state("processing")
         mic_active = False  # Disable microphone while processing
-        threading.Thread(target=animate_processing).start()
+        
+        # Pick the source language (from the speaker's prior or a quick
+        # look at the first fraction of a second), then recognize once
+        with status.stage("route"):
+            src, locale, dest = router.route(audio, LOCAL_SPEAKER)
         
         # Submit recognition task to thread pool
-        future_recognition = executor.submit(recognize_audio, audio)
-        bengali_text = future_recognition.result(timeout=8)  # Increased timeout
+        # It holds its own lease: the ring region outlives a timeout here
+        future_recognition = executor.submit(recognize_audio, audio, locale, language_name(src), lease.acquire())
+        source_text = future_recognition.result(timeout=8)  # Increased timeout
         
-        if not bengali_text:
+        router.confirm(LOCAL_SPEAKER, src, source_text)
+        if not source_text:
             print("Speech not recognized. Please try again.")
-            processing = False
             mic_active = True  # Re-enable microphone
             return
             
         sys.stdout.write('\r\033[K')  # Clear current line
-        print(f"\rBengali: {bengali_text}")
+        print(f"\r{language_name(src)}: {source_text}")
+        status.post("transcript", lang=src, text=source_text)
         
-        # Submit translation task to thread pool
-        print("Translating...", end="\r")
-        future_translation = executor.submit(translate_text, bengali_text)
-        english_text = future_translation.result(timeout=5)  # Increased timeout
-        print("              ", end="\r")  # Clear the line
+        # Exact phrasebook matches skip translation and synthesis
+        entry = phrasebook.lookup(source_text, src, dest)
+        speculation = None
+        if entry:
+            translated_text = entry['translation']
+        else:
+            # Start synthesizing likely translations while the real one is fetched
+            speculation = speculator.speculate(source_text, src, dest)
+            # Submit translation task to thread pool
+            future_translation = executor.submit(translate_text, source_text, src, dest)
+            translated_text = future_translation.result(timeout=5)  # Increased timeout
         
-        if not english_text:
+        if not translated_text:
             print("\rTranslation failed")
-            processing = False
+            if speculation is not None:
+                speculation.cancel()
             mic_active = True  # Re-enable microphone
             return
             
-        print(f"English: {english_text}\n")
+        print(f"{language_name(dest)}: {translated_text}\n")
+        status.post("translation", lang=dest, text=translated_text)
         
-        # Pause mic and speak the response
-        print("Speaking response...", end="\r")
-        speaking_thread = executor.submit(speak_text_gtts, english_text, 'en')
-        speaking_thread.result()  # Wait for speaking to complete
-        print("                    ", end="\r")  # Clear the line
+        # Keep speculative audio only if it matches the final translation
+        speech = None
+        if not entry:
+            speech = speculator.finish(speculation, source_text, src, dest, translated_text)
+            if speculation is not None:
+                status.post("speculation", result="miss" if speech is None else "hit" if len(speech) == 1 else "prefix")
         
-        # Brief pause after speech to avoid cutting off playback
-        time.sleep(0.3)
+        # Pause mic and speak the response
+        with status.stage("speak"):
+            speaking_thread = executor.submit(speak_text_gtts, translated_text, dest, speech)
+            speaking_thread.result()  # Wait for speaking to complete
         
     except concurrent.futures.TimeoutError:
         print("\rOperation timed out. The network may be slow.")
     except Exception as e:
         print(f"\rError: {str(e)}")
     finally:
-        processing = False
+        status.set_state("idle")
         mic_active = True  # Re-enable microphone
 
 # Flag to control microphone activation
 mic_active = True
 
 def audio_callback(recognizer, audio):
-    global listening, mic_active
-    listening = False
+    global mic_active
     if mic_active:  # Only process audio when microphone should be active
-        executor.submit(process_audio, audio)
+        audio_slice, token = audio_ring.write_audio(audio)
+        if audio_slice is None:
+            print("\rFalling behind; dropped an utterance")
+            return
+        # Its ring space is reused once the worker and every recognition
+        # attempt it started are done with it
+        lease = Lease(lambda: audio_ring.release(token))
+        future = executor.submit(process_audio, audio_slice, lease)
+        future.add_done_callback(lambda f: lease.close())
 
 def start_listening():
-    global listening, mic_active
+    global mic_active
     
     # Try to use device index for microphone to avoid system audio
     try:
@@ -207,25 +258,22 @@ def start_listening():
         with sr.Microphone(device_index=mic_index) as source:
             print("Calibrating microphone...")
             recognizer.adjust_for_ambient_noise(source, duration=1.0)  # Increased calibration time
-            print("Ready! Speak in Bengali...")
+            print(f"Ready! Speak in {' or '.join(language_name(l) for l in router.sources)}...")
             
             while True:
                 try:
                     # Only listen when mic_active is True
                     if mic_active:
-                        listening = True
-                        threading.Thread(target=animate_listening).start()
+                        status.set_state("listening")
                         
                         # Use shorter timeouts for faster response
                         audio = recognizer.listen(source, timeout=1, phrase_time_limit=4)
-                        listening = False
                         audio_callback(recognizer, audio)
                     else:
                         # When mic is not active, just wait a bit
                         time.sleep(0.1)
                     
                 except sr.WaitTimeoutError:
-                    listening = False
                     continue
                 except Exception as e:
                     print(f"Listening error: {str(e)}")
@@ -237,20 +285,17 @@ def start_listening():
         with sr.Microphone() as source:
             print("Calibrating fallback microphone...")
             recognizer.adjust_for_ambient_noise(source, duration=1.0)
-            print("Ready! Speak in Bengali...")
+            print(f"Ready! Speak in {' or '.join(language_name(l) for l in router.sources)}...")
             
             while True:
                 try:
                     if mic_active:
-                        listening = True
-                        threading.Thread(target=animate_listening).start()
+                        status.set_state("listening")
                         audio = recognizer.listen(source, timeout=1, phrase_time_limit=4)
-                        listening = False
                         audio_callback(recognizer, audio)
                     else:
                         time.sleep(0.1)
                 except sr.WaitTimeoutError:
-                    listening = False
                     continue
                 except Exception as e:
                     print(f"Listening error: {str(e)}")
@@ -260,36 +305,34 @@ def start_listening():
 def warmup():
     """Pre-initialize components to reduce first-run latency"""
     print("Warming up components...")
-    # Force translator initialization
-    try:
-        translator.translate("hello", src='en', dest='bn')
-    except:
-        pass
+    # Open and warm the client pools in parallel
+    pool_threads = [threading.Thread(target=pool.start) for pool in (recognizer_clients, translator_clients)]
+    for t in pool_threads:
+        t.start()
     
-    # Precache some common responses
-    common_phrases = [
-        "I didn't understand that",
-        "Could you repeat that?",
-        "Thank you",
-        "How can I help you?"
-    ]
+    # Map the phrasebook bundle instead of synthesizing phrases one by one
+    if phrasebook.load():
+        print(f"Phrasebook loaded with {len(phrasebook)} phrases")
+    if speculator.history.load():
+        print(f"Turn history loaded with {len(speculator.history)} phrases")
     
-    # Preload TTS for common phrases
-    for phrase in common_phrases:
-        try:
-            tts = gTTS(text=phrase, lang='en', slow=False)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-                temp_filename = fp.name
-            
-            tts.save(temp_filename)
-            tts_cache[phrase] = temp_filename
-        except:
-            pass
+    for t in pool_threads:
+        t.join()
             
     print("System ready!")
 
 # Main execution
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bengali to English voice translator")
+    add_arguments(parser)
+    add_status_arguments(parser)
+    args = parser.parse_args()
+    router = LanguageRouter(args.pairs, recognize=_remote_recognize)
+    
+    # One status renderer for the session; SIGUSR1 dumps memory
+    status = status_from_args(args).start()
+    install_memory_signal()
+    
     # Run warmup in the main thread to ensure it completes
     warmup()
     
@@ -311,11 +354,17 @@ if __name__ == "__main__":
             time.sleep(0.1)
     except KeyboardInterrupt:
         print("\nExiting...")
-        # Clean up cached files
-        for filename in tts_cache.values():
-            try:
-                os.remove(filename)
-            except:
-                pass
-        executor.shutdown(wait=False)
+        mic_active = False  # No new utterances into the ring
+        phrasebook.close()
+        playback.engine.close()
+        router.shutdown()
+        speculator.shutdown()
+        status.stop()
+        # Every reader of the ring has to stop before it is unmapped
+        executor.shutdown(wait=True, cancel_futures=True)
+        recognition_policy.shutdown(wait=True)
+        translation_policy.shutdown()
+        audio_ring.close()
+        recognizer_clients.close()
+        translator_clients.close()
         sys.exit(0)
@@ -0,0 +1,233 @@
+import os
+import re
+import sys
+import json
+import mmap
+import struct
+import argparse
+import unicodedata
+import concurrent.futures
+
+DEFAULT_CONFIG = "phrasebook.json"
+DEFAULT_BUNDLE = "phrasebook.bin"
+
+# Bundle layout: magic, uint64 index length, JSON index, concatenated clips.
+# Clips are int16 PCM and the data region starts on an aligned offset so
+# they can be viewed in place with np.frombuffer.
+BUNDLE_MAGIC = b"PHRB1\n"
+INDEX_LENGTH = struct.Struct("<Q")
+DATA_ALIGNMENT = 16
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Canonical form used for phrasebook matching.
+
+    Case, punctuation and symbols (including the Bengali danda) and
+    repeated whitespace are ignored, so "Thank you!" matches "thank you".
+    Combining marks such as Bengali vowel signs and the virama are kept.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = "".join(" " if unicodedata.category(c)[0] in "PS" else c for c in text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _source_key(text, src, dest):
+    return f"{src}>{dest}:{normalize_text(text)}"
+
+
+def _speech_key(text, lang):
+    return f"{lang}:{normalize_text(text)}"
+
+
+class Phrasebook:
+    """Memory-mapped bundle of pre-translated, pre-synthesized phrases"""
+
+    def __init__(self, path=DEFAULT_BUNDLE):
+        self.path = path
+        self.entries = []
+        self._by_source = {}
+        self._by_speech = {}
+        self._file = None
+        self._mm = None
+        self._data_start = 0
+
+    def load(self):
+        """Map the bundle into memory. Returns False if it doesn't exist."""
+        if not os.path.exists(self.path):
+            return False
+
+        self._file = open(self.path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a phrasebook bundle")
+
+        offset = len(BUNDLE_MAGIC)
+        (index_length,) = INDEX_LENGTH.unpack_from(self._mm, offset)
+        offset += INDEX_LENGTH.size
+        index = json.loads(self._mm[offset:offset + index_length].decode("utf-8"))
+        self._data_start = offset + index_length
+
+        self.entries = index["entries"]
+        for entry in self.entries:
+            self._by_source[_source_key(entry["text"], entry["src"], entry["dest"])] = entry
+            self._by_speech.setdefault(_speech_key(entry["translation"], entry["dest"]), entry)
+        return True
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, text, src, dest):
+        """Entry whose source phrase matches text, or None"""
+        return self._by_source.get(_source_key(text, src, dest))
+
+    def lookup_speech(self, text, lang):
+        """Entry whose synthesized translation matches text, or None"""
+        return self._by_speech.get(_speech_key(text, lang))
+
+    def audio(self, entry):
+        """Zero-copy view of an entry's audio inside the mapped bundle"""
+        start = self._data_start + entry["offset"]
+        return memoryview(self._mm)[start:start + entry["length"]]
+
+    def pcm(self, entry):
+        """Entry audio as (int16 samples, rate) without decoding or copying"""
+        import numpy as np
+        audio = self.audio(entry)
+        if entry["format"] == "pcm16":
+            return np.frombuffer(audio, dtype=np.int16), entry["rate"]
+
+        # Bundles built before clips were stored as PCM
+        from speech_synthesis import mp3_to_pcm, SYNTH_RATE
+        return mp3_to_pcm(audio), SYNTH_RATE
+
+    def close(self):
+        self._by_source.clear()
+        self._by_speech.clear()
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # Views still exported; the map is freed with them
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def load_config(config_path=DEFAULT_CONFIG):
+    """Flatten the config into (text, src, dest, translation-or-None) items"""
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    items = []
+    for pair in config["pairs"]:
+        for phrase in pair["phrases"]:
+            if isinstance(phrase, dict):
+                items.append((phrase["text"], pair["src"], pair["dest"], phrase.get("translation")))
+            else:
+                items.append((phrase, pair["src"], pair["dest"], None))
+    return items
+
+
+def _compile_item(item, translator_clients):
+    from speech_synthesis import synthesize, SYNTH_RATE
+
+    text, src, dest, translation = item
+    if translation is None:
+        if src == dest:
+            translation = text
+        else:
+            with translator_clients.client() as client:
+                translation = client.translate(text, src=src, dest=dest)
+
+    # Decode once at build time so playback never pays for MP3
+    pcm = synthesize(translation, dest, output="pcm")
+    return {
+        "text": text,
+        "src": src,
+        "dest": dest,
+        "translation": translation,
+        "format": "pcm16",
+        "rate": SYNTH_RATE,
+        "audio": pcm.tobytes()
+    }
+
+
+def build_bundle(config_path=DEFAULT_CONFIG, output_path=DEFAULT_BUNDLE, workers=8):
+    """Translate and synthesize every configured phrase in parallel"""
+    from client_pool import translator_pool
+
+    items = load_config(config_path)
+    translator_clients = translator_pool(size=min(workers, 4), timeout=10)
+
+    compiled = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_compile_item, item, translator_clients): item for item in items}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                compiled.append(future.result())
+            except Exception as e:
+                print(f"Skipping {futures[future][0]!r}: {e}")
+    translator_clients.close()
+
+    # Stable order keeps rebuilt bundles byte-identical for the same input
+    compiled.sort(key=lambda c: (c["src"], c["dest"], c["text"]))
+
+    entries = []
+    clips = []
+    offset = 0
+    for c in compiled:
+        audio = c.pop("audio")
+        entries.append(dict(c, offset=offset, length=len(audio)))
+        clips.append(audio)
+        offset += len(audio)
+
+    index = json.dumps({"entries": entries}, ensure_ascii=False).encode("utf-8")
+    header_size = len(BUNDLE_MAGIC) + INDEX_LENGTH.size
+    index += b" " * (-(header_size + len(index)) % DATA_ALIGNMENT)
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(INDEX_LENGTH.pack(len(index)))
+        f.write(index)
+        for audio in clips:
+            f.write(audio)
+    os.replace(tmp_path, output_path)
+
+    print(f"Phrasebook with {len(entries)} phrases written to {output_path}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the phrasebook bundle")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="translate and synthesize all configured phrases")
+    build.add_argument("--config", default=DEFAULT_CONFIG)
+    build.add_argument("--output", default=DEFAULT_BUNDLE)
+    build.add_argument("--workers", type=int, default=8)
+
+    show = sub.add_parser("list", help="list the phrases in a bundle")
+    show.add_argument("--bundle", default=DEFAULT_BUNDLE)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_bundle(args.config, args.output, args.workers)
+    else:
+        book = Phrasebook(args.bundle)
+        if not book.load():
+            print(f"No phrasebook bundle at {args.bundle}")
+            sys.exit(1)
+        for entry in book.entries:
+            print(f"[{entry['src']}>{entry['dest']}] {entry['text']} -> {entry['translation']}")
+        book.close()
+
+
+if __name__ == "__main__":
+    main()
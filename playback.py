@@ -0,0 +1,141 @@
+import time
+import queue
+import threading
+
+import numpy as np
+
+from speech_synthesis import SYNTH_RATE
+from audio_normalize import to_float32, resample
+
+# Rate the output device is opened at; everything is converted to it once.
+# Matching the synthesis rate means cached TTS clips play without resampling.
+OUTPUT_RATE = SYNTH_RATE
+BLOCK_SIZE = 512
+
+
+def decode_file(path):
+    """Decode a WAV or MP3 file to (float32 mono samples, rate)"""
+    if path.lower().endswith(".mp3"):
+        with open(path, "rb") as f:
+            return decode_mp3(f.read())
+    import soundfile as sf
+    audio, rate = sf.read(path, dtype="float32")
+    return to_float32(audio), rate
+
+
+def decode_mp3(data):
+    """Decode MP3 bytes to (float32 mono samples, rate)"""
+    from speech_synthesis import mp3_to_pcm
+    return to_float32(mp3_to_pcm(data)), SYNTH_RATE
+
+
+class PlaybackJob:
+    """One queued buffer; start/end are monotonic times the audio hits the DAC"""
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.position = 0
+        self.started_at = None
+        self.ended_at = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until playback has finished; returns (started_at, ended_at)"""
+        self.done.wait(timeout)
+        return self.started_at, self.ended_at
+
+
+class AudioOutputEngine:
+    """Single long-lived output stream fed from a queue of buffers.
+
+    The device is opened once and kept open, so each utterance costs only
+    a resample (if its rate differs) and a queue put. Start and end times
+    come from the stream's DAC timestamps, not from guesses.
+    """
+
+    def __init__(self, rate=OUTPUT_RATE, device=None, block_size=BLOCK_SIZE):
+        self.rate = rate
+        self.device = device
+        self.block_size = block_size
+        self.jobs = queue.Queue()
+        self.current = None
+        self.stream = None
+        self.idle = threading.Event()
+        self.idle.set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.stream is None:
+                import sounddevice as sd
+                self.stream = sd.OutputStream(
+                    samplerate=self.rate, channels=1, dtype="float32",
+                    blocksize=self.block_size, device=self.device,
+                    callback=self._callback)
+                self.stream.start()
+        return self
+
+    def _dac_time(self, time_info, frame_offset):
+        """Monotonic time at which frame_offset of this block is heard"""
+        latency = time_info.outputBufferDacTime - time_info.currentTime
+        return time.monotonic() + max(0.0, latency) + frame_offset / self.rate
+
+    def _callback(self, outdata, frames, time_info, status):
+        filled = 0
+        while filled < frames:
+            if self.current is None:
+                try:
+                    self.current = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+            job = self.current
+            if job.started_at is None:
+                job.started_at = self._dac_time(time_info, filled)
+
+            count = min(frames - filled, len(job.samples) - job.position)
+            outdata[filled:filled + count, 0] = job.samples[job.position:job.position + count]
+            job.position += count
+            filled += count
+
+            if job.position >= len(job.samples):
+                job.ended_at = self._dac_time(time_info, filled)
+                job.done.set()
+                self.current = None
+
+        if filled < frames:
+            outdata[filled:] = 0
+            if self.current is None and self.jobs.empty():
+                self.idle.set()
+
+    def play(self, audio, rate):
+        """Queue samples (NumPy array or int16 bytes) and return the job"""
+        self.start()
+        samples = resample(to_float32(audio), rate, self.rate)
+        job = PlaybackJob(np.ascontiguousarray(samples, dtype=np.float32))
+        self.idle.clear()
+        self.jobs.put(job)
+        return job
+
+    def play_file(self, path):
+        audio, rate = decode_file(path)
+        return self.play(audio, rate)
+
+    def wait_until_heard(self, job, timeout=None):
+        """Wait for the job, then until its last sample has left the speaker"""
+        _, ended_at = job.wait(timeout)
+        if ended_at is not None:
+            delay = ended_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return job
+
+    def close(self):
+        with self._lock:
+            if self.stream is not None:
+                self.stream.stop()
+                self.stream.close()
+                self.stream = None
+
+
+# Shared engine for the CLI translators
+engine = AudioOutputEngine()
@@ -0,0 +1,174 @@
+import time
+import wave
+import threading
+
+import numpy as np
+import pyaudio
+
+from audio_normalize import CANONICAL_RATE
+
+RING_SECONDS = 10     # audio the writer may fall behind by before samples are lost
+CLIP_LEVEL = 32767    # |sample| at or above this counts as clipped
+
+
+class TakeStats:
+    """What one recording ended up with"""
+
+    def __init__(self, filename, rate):
+        self.filename = filename
+        self.rate = rate
+        self.frames = 0
+        self.peak = 0
+        self.clipped = 0
+        self.overflows = 0   # input overflows reported by the device
+        self.dropped = 0     # samples overwritten before they could be written
+
+    @property
+    def duration(self):
+        return self.frames / self.rate
+
+    @property
+    def peak_dbfs(self):
+        return 20 * np.log10(max(self.peak, 1) / 32768.0)
+
+
+class Recorder:
+    """Callback-mode microphone capture for back-to-back takes.
+
+    One PyAudio instance and one input stream are opened on first use and
+    kept running. The PortAudio callback only copies each buffer into a
+    preallocated ring; record() drains the ring into the WAV file while the
+    take is running and keeps peak and clipping counts as it goes, so a
+    slow console or CPU spike delays the writer instead of dropping audio.
+    """
+
+    def __init__(self, rate=CANONICAL_RATE, channels=1, chunk=2048, device=None,
+                 ring_seconds=RING_SECONDS, fallback_rates=(48000, 44100)):
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self.device = device
+        self.ring_seconds = ring_seconds
+        self.fallback_rates = fallback_rates
+        self._pa = None
+        self._stream = None
+        self._ring = None
+        self._written = 0        # total samples the callback has put in the ring
+        self._overflows = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pa(self):
+        if self._pa is None:
+            self._pa = pyaudio.PyAudio()
+        return self._pa
+
+    def open(self):
+        """Open and start the input stream (once); returns the rate in use"""
+        with self._lock:
+            if self._stream is not None:
+                return self.rate
+            last_error = None
+            for rate in (self.rate,) + tuple(self.fallback_rates):
+                try:
+                    self._ring = np.zeros(int(rate * self.ring_seconds) * self.channels, dtype=np.int16)
+                    self._written = 0
+                    self._stream = self.pa.open(format=pyaudio.paInt16,
+                                                channels=self.channels,
+                                                rate=rate,
+                                                input=True,
+                                                input_device_index=self.device,
+                                                frames_per_buffer=self.chunk,
+                                                stream_callback=self._callback)
+                    self._stream.start_stream()
+                    if rate != self.rate:
+                        print(f"Using alternative sample rate: {rate}")
+                    self.rate = rate
+                    return rate
+                except Exception as e:
+                    print(f"Error opening audio stream at {rate} Hz: {e}")
+                    last_error = e
+                    self._stream = None
+            raise last_error
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        # Runs on the PortAudio thread: copy and return, nothing else
+        if status & pyaudio.paInputOverflow:
+            self._overflows += 1
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        size = len(self._ring)
+        start = self._written % size
+        first = min(len(samples), size - start)
+        self._ring[start:start + first] = samples[:first]
+        self._ring[:len(samples) - first] = samples[first:]
+        self._written += len(samples)
+        return None, pyaudio.paContinue
+
+    def record(self, filename, duration, progress=None, poll_interval=0.05):
+        """Record duration seconds into filename and return its TakeStats.
+
+        progress, if given, is called with the fraction done a few times a
+        second. Ctrl+C ends the take early and keeps what was captured.
+        """
+        self.open()
+        stats = TakeStats(filename, self.rate)
+        total = int(duration * self.rate) * self.channels
+        start = self._written
+        position = start
+        overflows_before = self._overflows
+        size = len(self._ring)
+
+        wf = wave.open(filename, "wb")
+        wf.setnchannels(self.channels)
+        wf.setsampwidth(2)
+        wf.setframerate(self.rate)
+        try:
+            while position < start + total:
+                time.sleep(poll_interval)
+                available = min(self._written, start + total)
+                if available - position > size:
+                    # Writer fell a whole ring behind; skip what was overwritten
+                    stats.dropped += available - size - position
+                    position = available - size
+                while position < available:
+                    offset = position % size
+                    block = self._ring[offset:min(size, offset + available - position)]
+                    wf.writeframes(block.tobytes())
+                    # int32 so abs(-32768) doesn't wrap
+                    levels = np.abs(block.astype(np.int32))
+                    stats.peak = max(stats.peak, int(levels.max()))
+                    stats.clipped += int(np.count_nonzero(levels >= CLIP_LEVEL))
+                    stats.frames += len(block) // self.channels
+                    position += len(block)
+                if progress:
+                    progress((position - start) / total)
+        except KeyboardInterrupt:
+            print("\nRecording interrupted by user.")
+        finally:
+            wf.close()
+
+        stats.overflows = self._overflows - overflows_before
+        return stats
+
+    def input_devices(self):
+        """(index, name) of every device with input channels"""
+        info = self.pa.get_host_api_info_by_index(0)
+        devices = []
+        for i in range(info.get("deviceCount")):
+            device_info = self.pa.get_device_info_by_index(i)
+            if device_info.get("maxInputChannels") > 0:
+                devices.append((i, device_info.get("name")))
+        return devices
+
+    def close(self):
+        with self._lock:
+            if self._stream is not None:
+                try:
+                    self._stream.stop_stream()
+                    self._stream.close()
+                except Exception:
+                    pass
+                self._stream = None
+            if self._pa is not None:
+                self._pa.terminate()
+                self._pa = None
@@ -0,0 +1,251 @@
+import time
+import random
+import threading
+import collections
+import concurrent.futures
+
+
+class BackendUnavailable(Exception):
+    """Raised when a backend and its fallback both fail or time out"""
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies"""
+
+    def __init__(self, window=100, default=1.0):
+        self.samples = collections.deque(maxlen=window)
+        self.default = default
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            if len(self.samples) < 10:
+                return self.default
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one trial call through.
+
+    closed -> open after failure_threshold consecutive failures
+    open -> half-open after reset_timeout seconds
+    half-open -> closed on success, open again on failure
+
+    While half-open only one caller gets the trial; if its outcome is
+    never recorded, another trial is allowed after reset_timeout.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_at = None  # when the half-open trial was handed out
+        self._lock = threading.Lock()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state != "half-open":
+                return state == "closed"
+            now = time.monotonic()
+            if self.trial_at is not None and now - self.trial_at < self.reset_timeout:
+                return False
+            self.trial_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_at = None
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                # Trip, or re-trip after a failed half-open trial
+                self.opened_at = time.monotonic()
+
+
+class RequestPolicy:
+    """Hedging, jittered retries and a circuit breaker around one backend.
+
+    A call is sent once; if it has not answered after the backend's p95
+    latency a duplicate is sent and the first answer wins. Failed rounds
+    are retried with jittered exponential backoff until the deadline.
+    Losing attempts still queued are cancelled; a hedge is only sent
+    while a worker is free, so stragglers can't crowd out new calls.
+    Latency is measured from submission, queueing included.
+    When the breaker is open, calls go straight to the fallback.
+    Exceptions listed in non_retryable (e.g. "no speech recognised") are
+    valid answers and are raised to the caller unchanged.
+    """
+
+    def __init__(self, name, call, fallback=None, deadline=8.0, max_attempts=3,
+                 base_backoff=0.1, max_backoff=1.0, hedge=True, min_hedge_delay=0.2,
+                 non_retryable=(), breaker=None, max_workers=6):
+        self.name = name
+        self.call = call
+        self.fallback = fallback
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.min_hedge_delay = min_hedge_delay
+        self.non_retryable = tuple(non_retryable)
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker(default=deadline / 4)
+        self.max_workers = max_workers
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"{name}-policy")
+        self._outstanding = 0  # attempts submitted and not yet finished
+        self._outstanding_lock = threading.Lock()
+
+    def _timed_call(self, submitted_at, *args, **kwargs):
+        result = self.call(*args, **kwargs)
+        # From submission, so time spent queued for a worker counts too
+        self.latency.record(time.monotonic() - submitted_at)
+        return result
+
+    def _finished(self, _):
+        with self._outstanding_lock:
+            self._outstanding -= 1
+
+    def _submit(self, args, kwargs, submitted):
+        with self._outstanding_lock:
+            self._outstanding += 1
+        future = self.executor.submit(self._timed_call, time.monotonic(), *args, **kwargs)
+        future.add_done_callback(self._finished)
+        submitted.append(future)
+        return future
+
+    def _worker_free(self):
+        with self._outstanding_lock:
+            return self._outstanding < self.max_workers
+
+    def _run_round(self, remaining, args, kwargs, submitted):
+        """One attempt, plus a hedged duplicate if the first one is slow"""
+        futures = [self._submit(args, kwargs, submitted)]
+        hedge_delay = max(self.min_hedge_delay, self.latency.percentile(95))
+        end = time.monotonic() + remaining
+        last_error = None
+
+        try:
+            done, _ = concurrent.futures.wait(futures, timeout=min(hedge_delay, remaining))
+            if not done and self.hedge and self._worker_free():
+                futures.append(self._submit(args, kwargs, submitted))
+
+            pending = set(futures)
+            while pending:
+                timeout = end - time.monotonic()
+                if timeout <= 0:
+                    break
+                done, pending = concurrent.futures.wait(
+                    pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    error = future.exception()
+                    if error is None or isinstance(error, self.non_retryable):
+                        return future
+                    last_error = error
+
+            raise last_error or concurrent.futures.TimeoutError(f"{self.name} timed out")
+        finally:
+            # Losers that have not started yet never will; running ones end
+            # at their client timeout
+            for future in futures:
+                future.cancel()
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform between 0 and the capped exponential step
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+    def _use_fallback(self, args, kwargs, error):
+        if self.fallback is None:
+            raise BackendUnavailable(f"{self.name} unavailable: {error}")
+        try:
+            return self.fallback(*args, **kwargs)
+        except self.non_retryable:
+            raise
+        except Exception as e:
+            raise BackendUnavailable(f"{self.name} and fallback failed: {e}")
+
+    def execute(self, *args, on_settled=None, **kwargs):
+        """Run the call under the policy and return its result.
+
+        Hedged or timed-out attempts may outlive this call; on_settled,
+        if given, runs once every attempt has finished, so arguments that
+        borrow a buffer can be released only when nothing reads them.
+        """
+        submitted = []
+        try:
+            return self._execute(args, kwargs, submitted)
+        finally:
+            if on_settled is not None:
+                _when_all_done(submitted, on_settled)
+
+    def _execute(self, args, kwargs, submitted):
+        if not self.breaker.allow():
+            return self._use_fallback(args, kwargs, "circuit open")
+
+        end = time.monotonic() + self.deadline
+        last_error = None
+        for attempt in range(self.max_attempts):
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                future = self._run_round(remaining, args, kwargs, submitted)
+            except Exception as e:
+                last_error = e
+                self.breaker.record_failure()
+                if not self.breaker.allow():
+                    break
+                time.sleep(min(self._backoff(attempt), max(0, end - time.monotonic())))
+                continue
+
+            self.breaker.record_success()
+            return future.result()
+
+        print(f"\r{self.name} degraded ({last_error}), using fallback")
+        return self._use_fallback(args, kwargs, last_error)
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait)
+
+
+def _when_all_done(futures, callback):
+    """Run callback once after every future has finished (now if none are pending)"""
+    remaining = [len(futures) + 1]
+    lock = threading.Lock()
+
+    def done(_=None):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            callback()
+
+    for future in futures:
+        future.add_done_callback(done)
+    done()
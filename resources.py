@@ -0,0 +1,194 @@
+import os
+import sys
+import time
+import signal
+import tempfile
+import threading
+import tracemalloc
+from collections import OrderedDict
+
+# Temp files created by the translators carry this prefix so the janitor
+# can tell them apart from anything else in the temp directory
+TEMP_PREFIX = "translator-"
+TEMP_MAX_AGE = 15 * 60    # seconds before an orphaned temp file is removed
+GC_INTERVAL = 5 * 60      # seconds between temp-file sweeps
+TRACE_FRAMES = 10         # stack depth recorded once tracemalloc is on
+
+
+def sizeof(value):
+    """Bytes held by a cached value (arrays, bytes, or (array, rate) tuples)"""
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ByteBudgetCache:
+    """LRU mapping bounded by the total size of its values (and optionally count)"""
+
+    def __init__(self, max_bytes, max_item_bytes=None, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes or max_bytes
+        self.max_entries = max_entries
+        self.nbytes = 0
+        self.evictions = 0
+        self._items = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return default
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value):
+        """Store value, evicting least recently used entries; False if too big"""
+        size = sizeof(value)
+        if size > self.max_item_bytes:
+            return False
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._items[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes or (self.max_entries and len(self._items) > self.max_entries):
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+            return True
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+
+def temp_path(suffix=""):
+    """Name for a temp file the janitor may reclaim if it is never removed"""
+    fd, path = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def sweep_temp_files(max_age=TEMP_MAX_AGE, directory=None):
+    """Delete prefixed temp files older than max_age; returns how many"""
+    directory = directory or tempfile.gettempdir()
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return 0
+    with entries:
+        for entry in entries:
+            if not entry.name.startswith(TEMP_PREFIX):
+                continue
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass  # Still in use or already gone
+    return removed
+
+
+def start_temp_janitor(interval=GC_INTERVAL, max_age=TEMP_MAX_AGE):
+    """Sweep orphaned temp files every interval seconds on a daemon thread"""
+    stopped = threading.Event()
+
+    def run():
+        while not stopped.wait(interval):
+            removed = sweep_temp_files(max_age)
+            if removed:
+                print(f"\rRemoved {removed} stale temp files")
+
+    threading.Thread(target=run, name="temp-janitor", daemon=True).start()
+    return stopped
+
+
+def rss_mb():
+    """Resident set size of this process in MB (peak where current is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+_last_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def memory_report(limit=15):
+    """RSS, thread count and, once tracing, the top allocators and growth.
+
+    The first call starts tracemalloc (it slows allocation, so it stays
+    off until someone asks); later calls also report what grew since the
+    previous one, which is what points at a leak.
+    """
+    global _last_snapshot
+    report = {"rss_mb": round(rss_mb(), 1), "threads": threading.active_count()}
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+        report["tracing"] = "started; request again for allocators"
+        return report
+
+    with _snapshot_lock:
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        previous, _last_snapshot = _last_snapshot, snapshot
+
+    current, peak = tracemalloc.get_traced_memory()
+    report["traced_mb"] = round(current / 2 ** 20, 1)
+    report["traced_peak_mb"] = round(peak / 2 ** 20, 1)
+    report["top"] = [{"where": str(stat.traceback[0]), "kb": round(stat.size / 1024, 1), "count": stat.count}
+                     for stat in snapshot.statistics("lineno")[:limit]]
+    if previous is not None:
+        report["growth"] = [{"where": str(stat.traceback[0]), "kb": round(stat.size_diff / 1024, 1),
+                             "count": stat.count_diff}
+                            for stat in snapshot.compare_to(previous, "lineno")[:limit] if stat.size_diff > 0]
+    return report
+
+
+def print_memory_report(limit=15):
+    report = memory_report(limit)
+    print(f"\n=== Memory: {report['rss_mb']} MB RSS, {report['threads']} threads ===")
+    if "tracing" in report:
+        print(f"tracemalloc {report['tracing']}")
+        return
+    print(f"Traced: {report['traced_mb']} MB (peak {report['traced_peak_mb']} MB)")
+    for stat in report["top"]:
+        print(f"  {stat['kb']:10.1f} KB  {stat['count']:7d}  {stat['where']}")
+    if report.get("growth"):
+        print("Growth since last dump:")
+        for stat in report["growth"]:
+            print(f"  {stat['kb']:+10.1f} KB  {stat['count']:+7d}  {stat['where']}")
+
+
+def install_memory_signal(sig_name="SIGUSR1"):
+    """Print a memory report whenever the process gets sig_name (POSIX only)"""
+    sig = getattr(signal, sig_name, None)
+    if sig is None or threading.current_thread() is not threading.main_thread():
+        return False
+    # Report on a thread: the handler may interrupt code holding locks
+    signal.signal(sig, lambda *_: threading.Thread(target=print_memory_report, daemon=True).start())
+    return True
@@ -0,0 +1,81 @@
+import threading
+
+
+class RoomRegistry:
+    """Bidirectional sid <-> rooms index shared by the Socket.IO servers.
+
+    Every room maps to a dict of ``sid -> info`` and every sid maps to the
+    set of rooms it is in, so join, leave and disconnect never have to scan
+    other rooms. Rooms and sids are dropped as soon as they become empty.
+    """
+
+    def __init__(self):
+        self._rooms = {}      # room -> {sid: info}
+        self._sid_rooms = {}  # sid -> set(room)
+        self._lock = threading.RLock()
+
+    def join(self, room, sid, info=None):
+        """Add sid to room and return the member list after joining"""
+        with self._lock:
+            self._rooms.setdefault(room, {})[sid] = info if info is not None else {}
+            self._sid_rooms.setdefault(sid, set()).add(room)
+            return list(self._rooms[room])
+
+    def leave(self, room, sid):
+        """Remove sid from room. Returns True if it was a member."""
+        with self._lock:
+            members = self._rooms.get(room)
+            if members is None or sid not in members:
+                return False
+
+            del members[sid]
+            if not members:
+                del self._rooms[room]
+
+            rooms = self._sid_rooms.get(sid)
+            if rooms is not None:
+                rooms.discard(room)
+                if not rooms:
+                    del self._sid_rooms[sid]
+            return True
+
+    def disconnect(self, sid):
+        """Remove sid from every room it joined and return those rooms"""
+        with self._lock:
+            rooms = self._sid_rooms.pop(sid, set())
+            for room in rooms:
+                members = self._rooms.get(room)
+                if members is None:
+                    continue
+                members.pop(sid, None)
+                if not members:
+                    del self._rooms[room]
+            return list(rooms)
+
+    def members(self, room):
+        """Return the sids currently in room"""
+        with self._lock:
+            return list(self._rooms.get(room, ()))
+
+    def member_info(self, room, sid):
+        """Return the info dict stored for sid in room, or None"""
+        with self._lock:
+            return self._rooms.get(room, {}).get(sid)
+
+    def infos(self, room):
+        """Return a snapshot of the info dicts for everyone in room"""
+        with self._lock:
+            return list(self._rooms.get(room, {}).values())
+
+    def rooms_of(self, sid):
+        """Return the rooms sid is currently in"""
+        with self._lock:
+            return list(self._sid_rooms.get(sid, ()))
+
+    def __contains__(self, room):
+        with self._lock:
+            return room in self._rooms
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rooms)
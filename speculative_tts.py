@@ -0,0 +1,211 @@
+import os
+import re
+import json
+import threading
+import concurrent.futures
+from collections import OrderedDict
+
+from phrasebook import normalize_text
+
+DEFAULT_HISTORY = "turn_history.json"
+MAX_TURNS = 2000           # distinct source phrases remembered
+MAX_PREDICTIONS = 2        # full-sentence guesses synthesized per turn
+MIN_PREFIX_WORDS = 1
+RESOLVE_TIMEOUT = 1.0      # seconds a matching guess may still take to finish
+
+# Where a sentence can be split without the join being audible
+_CLAUSE_END = re.compile(r"[,;:।॥?!.]\s+")
+
+
+def first_clause(text):
+    """Leading clause of text, or None if it is a single clause"""
+    match = _CLAUSE_END.search(text)
+    if not match or not text[match.end():].strip():
+        return None
+    return text[:match.start()]
+
+
+def split_after(text, prefix):
+    """Remainder of text after words matching prefix (normalized), or None"""
+    target = normalize_text(prefix)
+    words = text.split()
+    for i in range(MIN_PREFIX_WORDS, len(words)):
+        head = normalize_text(" ".join(words[:i]))
+        if head == target:
+            return " ".join(words[i:])
+        if len(head) > len(target):
+            break
+    return None
+
+
+class TurnHistory:
+    """Translations seen for each source phrase, most frequent first.
+
+    Bounded LRU over source phrases; optionally saved between sessions so
+    repeated conversations are predicted from the first turn.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY, max_turns=MAX_TURNS):
+        self.path = path
+        self.max_turns = max_turns
+        self._turns = OrderedDict()  # (src, dest, normalized source) -> {translation: count}
+        self._lock = threading.Lock()
+
+    def record(self, source, src, dest, translation):
+        key = (src, dest, normalize_text(source))
+        if not key[2] or not translation:
+            return
+        with self._lock:
+            counts = self._turns.pop(key, {})
+            counts[translation] = counts.get(translation, 0) + 1
+            self._turns[key] = counts
+            if len(self._turns) > self.max_turns:
+                self._turns.popitem(last=False)
+
+    def predict(self, source, src, dest, limit=MAX_PREDICTIONS):
+        """Likely translations of source, best first"""
+        with self._lock:
+            counts = self._turns.get((src, dest, normalize_text(source)))
+            if not counts:
+                return []
+            return sorted(counts, key=counts.get, reverse=True)[:limit]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._turns)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read turn history: {e}")
+            return False
+        with self._lock:
+            for src, dest, source, counts in rows[-self.max_turns:]:
+                self._turns[(src, dest, source)] = counts
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            rows = [[src, dest, source, counts] for (src, dest, source), counts in self._turns.items()]
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+class Speculation:
+    """Synthesis started for guesses at one turn's translation"""
+
+    def __init__(self, full, prefix):
+        self.full = full      # [(predicted translation, future)]
+        self.prefix = prefix  # (predicted translation of the first clause, future) or None
+
+    def resolve(self, translation, timeout=RESOLVE_TIMEOUT):
+        """Speech parts for the final translation, or None on a miss.
+
+        Parts are (audio, rate) clips or, after a prefix hit, the text of
+        the rest of the sentence still to be synthesized. Futures that
+        did not match are cancelled (or left to finish and be dropped).
+        A match still queued behind an earlier turn's guess, or not done
+        within timeout, is dropped too, so the normal path is never slower.
+        """
+        target = normalize_text(translation)
+        parts = None
+        for text, future in self.full:
+            if parts is None and normalize_text(text) == target:
+                parts = [future]
+        if parts is None and self.prefix is not None:
+            rest = split_after(translation, self.prefix[0])
+            if rest:
+                parts = [self.prefix[1], rest]
+        kept = {id(part) for part in parts or ()}
+        for _, future in self.full + ([self.prefix] if self.prefix else []):
+            if id(future) not in kept:
+                future.cancel()
+        if parts is None:
+            return None
+        futures = [part for part in parts if isinstance(part, concurrent.futures.Future)]
+        if any(not f.running() and not f.done() for f in futures):
+            pending = futures  # Stale: the worker is still busy with older guesses
+        else:
+            _, pending = concurrent.futures.wait(futures, timeout=timeout)
+        if pending:
+            for future in futures:
+                future.cancel()
+            return None
+        try:
+            return [part.result() if isinstance(part, concurrent.futures.Future) else part for part in parts]
+        except Exception:
+            return None  # Failed speculative synthesis: fall back to the normal path
+
+    def cancel(self):
+        for _, future in self.full + ([self.prefix] if self.prefix else []):
+            future.cancel()
+
+
+class SpeculativeSynthesizer:
+    """Start TTS for a turn's likely translation before translation returns.
+
+    Guesses come from the turn history (the same source phrase translated
+    before) and, for multi-clause sentences, from a known translation of
+    the first clause. They are synthesized on a separate worker so the
+    real pipeline never waits for a guess; a miss costs one cancelled or
+    discarded synthesis.
+    """
+
+    def __init__(self, render, history=None, lookup=None, workers=1):
+        self.render = render    # (text, lang) -> (audio, rate)
+        self.history = history if history is not None else TurnHistory()
+        self.lookup = lookup    # (text, src, dest) -> known translation or None
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                           thread_name_prefix="speculate")
+
+    def _known(self, text, src, dest):
+        predictions = self.history.predict(text, src, dest, limit=1)
+        if predictions:
+            return predictions[0]
+        return self.lookup(text, src, dest) if self.lookup else None
+
+    def speculate(self, source, src, dest):
+        """Start synthesizing guesses for source's translation; None if there are none"""
+        full = [(text, self._pool.submit(self.render, text, dest))
+                for text in self.history.predict(source, src, dest)]
+        prefix = None
+        clause = first_clause(source)
+        if clause:
+            known = self._known(clause, src, dest)
+            if known:
+                prefix = (known, self._pool.submit(self.render, known, dest))
+        if not full and prefix is None:
+            return None
+        return Speculation(full, prefix)
+
+    def finish(self, speculation, source, src, dest, translation):
+        """Record the turn and return speech parts from a matching guess, if any"""
+        self.history.record(source, src, dest, translation)
+        if speculation is None:
+            return None
+        parts = speculation.resolve(translation)
+        if parts is None:
+            self.misses += 1
+        elif len(parts) == 1:
+            self.hits += 1
+        else:
+            self.prefix_hits += 1
+        return parts
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+        try:
+            self.history.save()
+        except OSError as e:
+            print(f"Could not save turn history: {e}")
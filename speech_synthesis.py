@@ -0,0 +1,72 @@
+import io
+
+# gTTS produces 24 kHz MP3; keeping that rate means decoding never resamples
+SYNTH_RATE = 24000
+
+# Decoded clips kept by PcmCache (~5 minutes of 24 kHz speech)
+PCM_CACHE_BYTES = 16 * 1024 * 1024
+
+
+def mp3_to_pcm(data, rate=SYNTH_RATE):
+    """Decode MP3 bytes once to mono int16 PCM at rate"""
+    import numpy as np
+    from pydub import AudioSegment
+    segment = AudioSegment.from_file(io.BytesIO(bytes(data)), format="mp3")
+    segment = segment.set_channels(1).set_sample_width(2)
+    pcm = np.frombuffer(segment.raw_data, dtype=np.int16)
+    if segment.frame_rate != rate:
+        from audio_normalize import resample, to_float32, to_pcm16
+        pcm = to_pcm16(resample(to_float32(pcm), segment.frame_rate, rate))
+    return pcm
+
+
+def synthesize_mp3(text, lang="en"):
+    """Raw gTTS output as MP3 bytes"""
+    from gtts import gTTS
+    fp = io.BytesIO()
+    gTTS(text=text, lang=lang, slow=False).write_to_fp(fp)
+    return fp.getvalue()
+
+
+def synthesize(text, lang="en", output="pcm", rate=SYNTH_RATE):
+    """Synthesize text as "pcm" (int16 array at rate) or "mp3" (bytes)"""
+    mp3 = synthesize_mp3(text, lang)
+    if output == "mp3":
+        return mp3
+    return mp3_to_pcm(mp3, rate)
+
+
+class PcmCache:
+    """Synthesized clips kept as decoded PCM so replays never touch MP3.
+
+    Least recently used clips are evicted once the cache holds max_entries
+    clips or max_bytes of audio, so it can run for days at a fixed size.
+    """
+
+    def __init__(self, max_entries=50, max_text_length=100, max_bytes=PCM_CACHE_BYTES):
+        from resources import ByteBudgetCache
+        self.max_entries = max_entries
+        self.max_text_length = max_text_length
+        self._clips = ByteBudgetCache(max_bytes, max_entries=max_entries)
+
+    @property
+    def nbytes(self):
+        return self._clips.nbytes
+
+    def get(self, text, lang="en"):
+        return self._clips.get((lang, text))
+
+    def put(self, text, lang, pcm):
+        """Cache short phrases only; returns True if stored"""
+        if len(text) >= self.max_text_length:
+            return False
+        return self._clips.put((lang, text), pcm)
+
+    def __contains__(self, key):
+        return key in self._clips
+
+    def __len__(self):
+        return len(self._clips)
+
+    def clear(self):
+        self._clips.clear()
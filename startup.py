@@ -0,0 +1,70 @@
+import sys
+import time
+import importlib
+import threading
+from contextlib import contextmanager
+
+# Wall-clock time of each deferred import and startup stage, in seconds
+import_times = {}
+stage_times = {}
+_process_start = time.perf_counter()
+_lock = threading.Lock()
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access.
+
+    ``gtts = LazyModule("gtts")`` costs nothing at import time; the first
+    ``gtts.gTTS`` triggers the import and records how long it took.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    already_loaded = self._name in sys.modules
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    if not already_loaded:
+                        import_times[self._name] = time.perf_counter() - start
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+@contextmanager
+def timed_stage(name):
+    """Record how long a startup stage takes"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            stage_times[name] = time.perf_counter() - start
+
+
+def elapsed():
+    """Seconds since this module was first imported"""
+    return time.perf_counter() - _process_start
+
+
+def print_startup_profile(ready_at=None):
+    """Print the import-time and stage breakdown collected so far"""
+    print("\n=== Startup profile ===")
+    if import_times:
+        print("Deferred imports:")
+        for name, seconds in sorted(import_times.items(), key=lambda kv: -kv[1]):
+            print(f"  {name:<28} {seconds * 1000:8.1f} ms")
+    if stage_times:
+        print("Stages:")
+        for name, seconds in sorted(stage_times.items(), key=lambda kv: -kv[1]):
+            print(f"  {name:<28} {seconds * 1000:8.1f} ms")
+    if ready_at is not None:
+        print(f"Time to ready: {ready_at * 1000:.1f} ms")
+    print("=" * 23)
@@ -0,0 +1,114 @@
+import sys
+import json
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+# Console text for each pipeline state; None clears the line
+STATE_TEXT = {
+    "listening": "Listening...",
+    "processing": "Processing...",
+    "speaking": "Speaking...",
+    "idle": None,
+}
+
+
+class StatusRenderer:
+    """Single consumer of pipeline status events.
+
+    The pipeline posts state changes, stage timings and results to a
+    queue; one thread blocks on it and redraws the console line only when
+    the text actually changes, or writes every event as a JSON line for
+    headless deployments. Nothing runs between events, so an idle
+    translator does not wake up at all.
+    """
+
+    def __init__(self, json_stream=None, stream=None):
+        self.json_stream = json_stream
+        self.stream = stream or sys.stdout
+        self.state = None
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._shown = None
+        self._drawn_state = None  # last state seen by the renderer thread
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="status", daemon=True)
+            self._thread.start()
+        return self
+
+    def post(self, event, **fields):
+        # Until started (e.g. when imported as a library) events are dropped
+        if self._thread is not None:
+            self._events.put(dict(event=event, ts=round(time.time(), 3), **fields))
+
+    def set_state(self, state, **fields):
+        """Announce a pipeline state; repeats of the current state are ignored"""
+        with self._lock:
+            if state == self.state:
+                return
+            self.state = state
+        self.post("state", state=state, **fields)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a pipeline stage and report its start and duration"""
+        self.post("stage", stage=name, status="start")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.post("stage", stage=name, status="done", seconds=round(time.perf_counter() - start, 3))
+
+    def stop(self):
+        if self._thread is not None:
+            self._events.put(None)
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                break
+            try:
+                if self.json_stream is not None:
+                    self.json_stream.write(json.dumps(event, ensure_ascii=False) + "\n")
+                    self.json_stream.flush()
+                else:
+                    self._draw(self._text(event))
+            except (OSError, ValueError):
+                pass  # A closed stream must not take the pipeline down
+        if self.json_stream is None:
+            self._draw(None)
+
+    def _text(self, event):
+        if event["event"] == "state":
+            self._drawn_state = event["state"]
+            return STATE_TEXT.get(event["state"], event["state"])
+        if event["event"] == "stage" and event["status"] == "start" and self._drawn_state == "processing":
+            return f"Processing: {event['stage']}..."
+        return self._shown
+
+    def _draw(self, text):
+        if text == self._shown:
+            return
+        self.stream.write("\r\033[K" + (text or ""))
+        self.stream.flush()
+        self._shown = text
+
+
+def add_arguments(parser):
+    parser.add_argument("--status-json", metavar="FILE",
+                        help="write status events as JSON lines to FILE ('-' for stdout) instead of the console line")
+
+
+def from_args(args):
+    """StatusRenderer configured by --status-json"""
+    if not getattr(args, "status_json", None):
+        return StatusRenderer()
+    if args.status_json == "-":
+        return StatusRenderer(json_stream=sys.stdout)
+    return StatusRenderer(json_stream=open(args.status_json, "a", encoding="utf-8", buffering=1))
@@ -0,0 +1,46 @@
+import os
+import time
+
+# Local stand-ins for Google recognition, translation and gTTS, used by
+# capacity tests (APP1_STUB_BACKENDS=1). They sleep about as long as the
+# real services usually take and return data of realistic size, so the
+# server's own threads, queues and memory are what gets measured.
+# STUB_LATENCY_SCALE=0 turns the delays off; 2 doubles them.
+LATENCY_SCALE = float(os.environ.get("STUB_LATENCY_SCALE", "1.0"))
+
+RECOGNITION_BASE = 0.3       # seconds per request
+RECOGNITION_PER_SECOND = 0.1  # seconds per second of audio
+TRANSLATION_LATENCY = 0.15
+SYNTHESIS_BASE = 0.2
+SYNTHESIS_PER_CHAR = 0.002
+SPEECH_SECONDS_PER_CHAR = 0.06
+MP3_BYTES_PER_SECOND = 4000  # gTTS output is ~32 kbit/s
+
+
+def _sleep(seconds):
+    if LATENCY_SCALE > 0:
+        time.sleep(seconds * LATENCY_SCALE)
+
+
+def recognize(audio, language="en-US"):
+    """Pretend transcript of an sr.AudioData, roughly two words per second"""
+    seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+    _sleep(RECOGNITION_BASE + RECOGNITION_PER_SECOND * seconds)
+    words = max(1, int(seconds * 2))
+    return " ".join(["hello"] * words)
+
+
+def translate(text, src, dest):
+    _sleep(TRANSLATION_LATENCY)
+    return f"[{dest}] {text}"
+
+
+def synthesize(text, lang="en", output="pcm", rate=None):
+    """Silence as long as text would take to say, as "pcm" or fake "mp3" bytes"""
+    import numpy as np
+    from speech_synthesis import SYNTH_RATE
+    _sleep(SYNTHESIS_BASE + SYNTHESIS_PER_CHAR * len(text))
+    seconds = SPEECH_SECONDS_PER_CHAR * len(text)
+    if output == "mp3":
+        return bytes(int(MP3_BYTES_PER_SECOND * seconds))
+    return np.zeros(int((rate or SYNTH_RATE) * seconds), dtype=np.int16)
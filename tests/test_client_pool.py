@@ -0,0 +1,118 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sr = pytest.importorskip("speech_recognition")
+
+from client_pool import ClientPool, GoogleSpeechClient, speech_pool
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Local stand-in for the speech endpoint; HTTP/1.0, so it closes every connection"""
+
+    transcript = "hello"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        results = [{"result": []}]
+        if self.transcript:
+            results.append({"result": [{"alternative": [{"transcript": self.transcript, "confidence": 0.9}]}]})
+        body = "\n".join(json.dumps(r) for r in results).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/recognize"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def speech(seconds=0.2):
+    return sr.AudioData(b"\0" * int(16000 * 2 * seconds), 16000, 2)
+
+
+def test_client_survives_connection_close(server):
+    client = GoogleSpeechClient(url=server, timeout=2)
+    # Every response closes the connection; later requests must reopen it
+    for _ in range(3):
+        assert client.recognize(speech()) == "hello"
+    client.close()
+
+
+def test_pool_reuses_clients(server):
+    created = []
+
+    def factory():
+        created.append(GoogleSpeechClient(url=server, timeout=2))
+        return created[-1]
+
+    pool = ClientPool(factory, size=2, refresh_interval=0).start()
+    for _ in range(5):
+        with pool.client() as client:
+            assert client.recognize(speech()) == "hello"
+    assert len(created) == 2
+    pool.close()
+
+
+def test_no_speech_keeps_client(server, monkeypatch):
+    monkeypatch.setattr(StandIn, "transcript", None)
+    pool = speech_pool(size=1, timeout=2, url=server)
+    pool.refresh_interval = 0
+    with pool.client() as first:
+        pass
+    with pytest.raises(sr.UnknownValueError):
+        with pool.client() as client:
+            client.recognize(speech())
+    with pool.client() as client:
+        assert client is first
+    pool.close()
+
+
+class Flaky:
+    closed = False
+
+    def ping(self):
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+def test_failed_replacement_leaves_an_empty_slot():
+    factory_fails = [False]
+
+    def factory():
+        if factory_fails[0]:
+            raise OSError("backend down")
+        return Flaky()
+
+    pool = ClientPool(factory, size=1, refresh_interval=0).start()
+    factory_fails[0] = True
+    with pytest.raises(RuntimeError):
+        with pool.client() as broken:
+            raise RuntimeError("call failed")
+    assert broken.closed
+
+    # The closed client is never handed out again; the slot is refilled once possible
+    with pytest.raises(OSError):
+        with pool.client():
+            pass
+    factory_fails[0] = False
+    with pool.client() as client:
+        assert client is not broken and not client.closed
+    pool.close()
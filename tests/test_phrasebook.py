@@ -0,0 +1,13 @@
+from phrasebook import normalize_text
+
+
+def test_punctuation_and_case_ignored():
+    assert normalize_text("Thank you!") == normalize_text("thank  you")
+    assert normalize_text("আমি ভালো আছি।") == "আমি ভালো আছি"
+
+
+def test_bengali_marks_kept():
+    # Vowel signs and the virama are combining marks, not punctuation
+    assert normalize_text("আমি") != normalize_text("আম")
+    assert normalize_text("না") != normalize_text("ন")
+    assert normalize_text("ধন্যবাদ") == "ধন্যবাদ"
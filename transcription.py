@@ -0,0 +1,61 @@
+import threading
+
+import speech_recognition as sr
+
+# Names accepted by get_backend()
+BACKENDS = ("google", "wav2vec2", "stub")
+
+
+def _read_audio_file(path):
+    with sr.AudioFile(path) as source:
+        return sr.Recognizer().record(source)
+
+
+def google_backend(language="en-US"):
+    """Transcribe with the Google Web Speech API"""
+    recognizer = sr.Recognizer()
+
+    def transcribe(path):
+        try:
+            return recognizer.recognize_google(_read_audio_file(path), language=language)
+        except sr.UnknownValueError:
+            return None
+
+    return transcribe
+
+
+def wav2vec2_backend(language=None):
+    """Transcribe locally with the wav2vec2 model (no network needed)"""
+    from local_asr import Wav2Vec2Recognizer
+    recognizer = Wav2Vec2Recognizer()
+    lock = threading.Lock()
+
+    def transcribe(path):
+        audio = _read_audio_file(path)
+        try:
+            # One forward pass at a time; the model is large
+            with lock:
+                return recognizer.recognize(audio)
+        except sr.UnknownValueError:
+            return None
+
+    return transcribe
+
+
+def stub_backend(language=None):
+    """No-op recognizer for offline runs and tests; leaves text empty"""
+    def transcribe(path):
+        return None
+
+    return transcribe
+
+
+def get_backend(name="google", language="en-US"):
+    """Return a transcribe(path) -> text-or-None callable"""
+    if name == "google":
+        return google_backend(language)
+    if name == "wav2vec2":
+        return wav2vec2_backend(language)
+    if name == "stub":
+        return stub_backend(language)
+    raise ValueError(f"Unknown recognizer backend: {name} (choose from {', '.join(BACKENDS)})")
@@ -1,39 +1,54 @@
 import time
 import threading
-import tempfile
 import os
+import argparse
 import speech_recognition as sr
 from googletrans import Translator
 from gtts import gTTS
 from playsound import playsound
+from language_id import LanguageRouter, DEFAULT_PAIRS, add_arguments, language_name
+from resources import temp_path, start_temp_janitor, install_memory_signal
 
 recognizer = sr.Recognizer()
 translator = Translator()
 
+def _recognize(audio, locale):
+    return recognizer.recognize_google(audio, language=locale)
+
+# Routes each utterance to a source language and target (--pairs)
+router = LanguageRouter(DEFAULT_PAIRS, recognize=_recognize)
+
 def speak_text_gtts(text, lang='en'):
     try:
         print(f"Speaking: {text}")  # Debug output
         tts = gTTS(text=text, lang=lang)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-            temp_filename = fp.name
-        tts.save(temp_filename)
-        playsound(temp_filename)
-        os.remove(temp_filename)
+        temp_filename = temp_path(".mp3")
+        try:
+            tts.save(temp_filename)
+            playsound(temp_filename)
+        finally:
+            os.remove(temp_filename)
     except Exception as e:
         print("TTS error:", e)
 
 def process_audio(recognizer, audio):
     try:
         print("Processing audio...")  # Debug output
-        bengali_text = recognizer.recognize_google(audio, language="bn-BD")
-        print("Bengali Transcript:", bengali_text)
+        src, locale, dest = router.route(audio, "local")
+        try:
+            source_text = recognizer.recognize_google(audio, language=locale)
+        except sr.UnknownValueError:
+            router.confirm("local", src, None)
+            raise
+        router.confirm("local", src, source_text)
+        print(f"{language_name(src)} Transcript:", source_text)
         
         # Translation step
-        translation = translator.translate(bengali_text, src='bn', dest='en')
-        english_text = translation.text
-        print("English Translation:", english_text)
+        translation = translator.translate(source_text, src=src, dest=dest)
+        translated_text = translation.text
+        print(f"{language_name(dest)} Translation:", translated_text)
         
-        speak_text_gtts(english_text, lang='en')
+        speak_text_gtts(translated_text, lang=dest)
     except sr.UnknownValueError:
         print("Could not understand audio.")
     except sr.RequestError as e:
@@ -41,15 +56,6 @@ def process_audio(recognizer, audio):
     except Exception as e:
         print(f"Unexpected error: {e}")  # Catch-all for other exceptions
 
-# Check available microphones (debug step)
-print("Available microphones:", sr.Microphone.list_microphone_names())
-
-mic = sr.Microphone()
-with mic as source:
-    print("Calibrating microphone... Please wait.")
-    recognizer.adjust_for_ambient_noise(source, duration=2)
-    print("Calibration complete. Start speaking...")
-
 # Verify microphone access
 def test_microphone():
     with sr.Microphone() as source:
@@ -62,15 +68,34 @@ def test_microphone():
         except Exception as e:
             print("Test recognition failed:", e)
 
-# Uncomment to run microphone test
-# test_microphone()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bengali to English voice translator")
+    add_arguments(parser)
+    args = parser.parse_args()
+    router = LanguageRouter(args.pairs, recognize=_recognize)
 
-stop_listening = recognizer.listen_in_background(mic, process_audio)
-print("Listening continuously. Press Ctrl+C to exit.")
+    # Check available microphones (debug step)
+    print("Available microphones:", sr.Microphone.list_microphone_names())
 
-try:
-    while True:
-        time.sleep(0.1)
-except KeyboardInterrupt:
-    print("Exiting...")
-    stop_listening(wait_for_stop=False)
+    mic = sr.Microphone()
+    with mic as source:
+        print("Calibrating microphone... Please wait.")
+        recognizer.adjust_for_ambient_noise(source, duration=2)
+        print("Calibration complete. Start speaking...")
+
+    # Uncomment to run microphone test
+    # test_microphone()
+
+    # Orphaned temp files are swept; SIGUSR1 dumps memory
+    start_temp_janitor()
+    install_memory_signal()
+
+    stop_listening = recognizer.listen_in_background(mic, process_audio)
+    print("Listening continuously. Press Ctrl+C to exit.")
+
+    try:
+        while True:
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        print("Exiting...")
+        stop_listening(wait_for_stop=False)
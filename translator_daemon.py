@@ -0,0 +1,258 @@
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+
+import translator_integration as ti
+from startup import LazyModule
+from client_pool import speech_pool, translator_pool
+from request_policy import RequestPolicy
+from language_id import LanguageRouter, language_name
+from resources import install_memory_signal
+
+sr = LazyModule("speech_recognition")
+playback = LazyModule("playback")
+
+DEFAULT_CONFIG = "daemon.json"
+
+# Utterances waiting per session; beyond this the oldest is dropped so a
+# backed-up booth answers what was said last, not what was said a minute ago
+QUEUE_SIZE = 4
+
+# Each session's own share of backend capacity: an attempt plus a hedge
+# for recognition and translation at once, with one spare
+SESSION_CLIENTS = 2
+SESSION_WORKERS = 3
+
+
+class Session:
+    """One microphone's listen -> recognize -> translate -> speak pipeline.
+
+    Each session listens and processes on its own two threads and keeps
+    its own recognizer, queue, feedback guard, backend clients and
+    policies, so a slow or stuck booth (and its hedges and retries) only
+    ever delays itself. Caches, the phrasebook, the voice model and the
+    local fallback recognizer come from translator_integration and are
+    shared by every session.
+    """
+
+    def __init__(self, name, input_device=None, engine=None, pairs="bn:en", queue_size=QUEUE_SIZE):
+        self.name = name
+        self.input_device = input_device
+        self.engine = engine
+        # Booths with several source languages detect them per utterance;
+        # the speaker prior is this booth's microphone
+        self.router = LanguageRouter(pairs, recognize=self._remote_recognize)
+        self.recognizer_clients = speech_pool(size=SESSION_CLIENTS, timeout=8)
+        self.translator_clients = translator_pool(size=SESSION_CLIENTS, timeout=5)
+        self.recognition_policy = None  # built once warm-up has imported speech_recognition
+        self.translation_policy = None
+        self.utterances = queue.Queue(maxsize=queue_size)
+        self.speaking = threading.Event()
+        self.stopped = threading.Event()
+        self.threads = []
+
+    def log(self, message):
+        print(f"[{self.name}] {message}")
+
+    def start(self):
+        for target in (self._listen, self._work):
+            thread = threading.Thread(target=target, name=f"{self.name}-{target.__name__.strip('_')}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stopped.set()
+        self.router.shutdown()
+        if self.recognition_policy:
+            self.recognition_policy.shutdown()
+            self.translation_policy.shutdown()
+        self.recognizer_clients.close()
+        self.translator_clients.close()
+
+    def _remote_recognize(self, audio, language):
+        with self.recognizer_clients.client() as client:
+            return client.recognize(audio, language=language)
+
+    def _remote_translate(self, text, src, dest):
+        with self.translator_clients.client() as client:
+            return client.translate(text, src=src, dest=dest)
+
+    def _start_backends(self):
+        """Open this session's clients and policies once the shared warm-up is done"""
+        pools = [threading.Thread(target=pool.start) for pool in (self.recognizer_clients, self.translator_clients)]
+        for thread in pools:
+            thread.start()
+        ti.backends_ready.wait()
+        # The wav2vec2 model is loaded once and shared
+        fallback = ti.recognition_policy.fallback if ti.recognition_policy else None
+        self.recognition_policy = RequestPolicy(f"{self.name} recognition", self._remote_recognize,
+                                                fallback=fallback, deadline=7.5,
+                                                non_retryable=(sr.UnknownValueError,),
+                                                max_workers=SESSION_WORKERS)
+        self.translation_policy = RequestPolicy(f"{self.name} translation", self._remote_translate,
+                                                deadline=4.5, max_workers=SESSION_WORKERS)
+        for thread in pools:
+            thread.join()
+
+    def _listen(self):
+        recognizer = ti.create_recognizer()
+        try:
+            with sr.Microphone(device_index=self.input_device) as source:
+                recognizer.adjust_for_ambient_noise(source, duration=1.0)
+                self.log(f"Listening ({self.router.describe()})")
+                while not self.stopped.is_set():
+                    # Don't pick up our own playback
+                    if self.speaking.is_set():
+                        time.sleep(0.05)
+                        continue
+                    try:
+                        audio = recognizer.listen(source, timeout=1, phrase_time_limit=4)
+                    except sr.WaitTimeoutError:
+                        continue
+                    except Exception as e:
+                        self.log(f"Listening error: {e}")
+                        time.sleep(1)
+                        continue
+                    if not self.speaking.is_set():
+                        self._enqueue(audio)
+        except Exception as e:
+            self.log(f"Microphone setup error: {e}")
+            self.stopped.set()
+
+    def _enqueue(self, audio):
+        try:
+            self.utterances.put_nowait(audio)
+        except queue.Full:
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                pass
+            self.utterances.put_nowait(audio)
+            self.log("Falling behind; dropped the oldest utterance")
+
+    def _work(self):
+        self._start_backends()
+        while not self.stopped.is_set():
+            try:
+                audio = self.utterances.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.handle(audio)
+            except Exception as e:
+                self.log(f"Error: {e}")
+
+    def handle(self, audio):
+        src, locale, dest = self.router.route(audio, self.name)
+        try:
+            text = self.recognition_policy.execute(audio, locale)
+        except sr.UnknownValueError:
+            self.router.confirm(self.name, src, None)
+            return
+        except Exception as e:
+            self.log(f"Recognition error: {e}")
+            return
+        self.router.confirm(self.name, src, text)
+        self.log(f"{language_name(src)}: {text}")
+
+        # Exact phrasebook matches skip translation and synthesis
+        entry = ti.phrasebook.lookup(text, src, dest)
+        if entry:
+            translation = entry["translation"]
+        else:
+            try:
+                translation = self.translation_policy.execute(text, src, dest)
+            except Exception as e:
+                self.log(f"Translation error: {e}")
+                return
+        if not translation:
+            return
+        self.log(f"{language_name(dest)}: {translation}")
+        self.say(translation, dest)
+
+    def say(self, text, lang):
+        self.speaking.set()
+        try:
+            if lang == "en" and ti.custom_voice and ti.custom_voice.speak_text(text, engine=self.engine):
+                return
+            job = self.engine.play(*ti.render_speech(text, lang))
+            # Keep the mic off until the last sample has actually been played
+            self.engine.wait_until_heard(job)
+        except Exception as e:
+            self.log(f"TTS error: {e}")
+        finally:
+            self.speaking.clear()
+
+
+def load_sessions(path):
+    """Sessions from a JSON config; booths sharing an output device share its engine"""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    engines = {}
+    sessions = []
+    for i, options in enumerate(config.get("sessions", [])):
+        output_device = options.get("output_device")
+        if output_device is None:
+            engine = playback.engine
+        else:
+            engine = engines.get(output_device)
+            if engine is None:
+                engine = engines[output_device] = playback.AudioOutputEngine(device=output_device)
+        sessions.append(Session(options.get("name", f"session-{i + 1}"),
+                                input_device=options.get("input_device"),
+                                engine=engine,
+                                pairs=options.get("pairs", "bn:en"),
+                                queue_size=options.get("queue_size", QUEUE_SIZE)))
+    return sessions, list(engines.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve several microphones with one shared translator")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="JSON file listing the sessions")
+    parser.add_argument("--list-devices", action="store_true", help="print microphone indexes and exit")
+    args = parser.parse_args()
+
+    if args.list_devices:
+        for i, name in enumerate(sr.Microphone.list_microphone_names()):
+            print(f"{i}: {name}")
+        return
+
+    sessions, engines = load_sessions(args.config)
+    if not sessions:
+        print(f"No sessions configured in {args.config}")
+        return
+
+    install_memory_signal()
+
+    # One warm-up for every session: fallback, phrasebook, voice model;
+    # each session opens its own backend clients
+    threading.Thread(target=ti.warmup, kwargs={"pools": False}, daemon=True).start()
+    for session in sessions:
+        session.start()
+    print(f"Serving {len(sessions)} sessions. Press Ctrl+C to exit.")
+
+    try:
+        while any(not session.stopped.is_set() for session in sessions):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\nExiting...")
+    finally:
+        for session in sessions:
+            session.stop()
+        for engine in engines:
+            engine.close()
+        ti.phrasebook.close()
+        playback.engine.close()
+        if ti.recognition_policy:
+            ti.recognition_policy.shutdown()
+            ti.translation_policy.shutdown()
+        ti.executor.shutdown(wait=False)
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,28 @@
 import time
 import threading
-import tempfile
 import os
 import sys
 import queue
-import speech_recognition as sr
-from googletrans import Translator
-from playsound import playsound
+import argparse
 import concurrent.futures
 import pickle
-from pydub import AudioSegment
-from pydub.playback import play
+from startup import LazyModule, timed_stage, elapsed, print_startup_profile, stage_times
+from client_pool import speech_pool, translator_pool
+from request_policy import RequestPolicy
+from phrasebook import Phrasebook
+from speech_synthesis import PcmCache, SYNTH_RATE, synthesize
+from local_asr import Wav2Vec2Recognizer
+from voice_index import VoiceIndex
+from language_id import LanguageRouter, DEFAULT_PAIRS, add_arguments, language_name
+from resources import install_memory_signal
+from speculative_tts import SpeculativeSynthesizer
+from status import StatusRenderer, add_arguments as add_status_arguments, from_args as status_from_args
+
+# Heavy dependencies are imported on first use, not at startup
+sr = LazyModule("speech_recognition")
+playback = LazyModule("playback")
 
 # Global flags
-listening = False
-processing = False
 mic_active = True  # Control mic activation
 
 # Use a thread pool for concurrent operations
@@ -27,38 +35,57 @@ text_queue = queue.Queue()
 # Semaphore to avoid audio feedback loops
 speaking_lock = threading.Semaphore(1)
 
-# Initialize components with optimized settings
-recognizer = sr.Recognizer()
-recognizer.pause_threshold = 0.3
-recognizer.energy_threshold = 4000
-recognizer.dynamic_energy_threshold = True
-recognizer.non_speaking_duration = 0.3
+# Set once the background warm-up has loaded backends and the voice model
+backends_ready = threading.Event()
+mic_ready = threading.Event()
+ready_times = {}  # seconds since start when each became ready (--profile-startup)
+
+# Created by start_listening so importing this module stays cheap
+recognizer = None
+
+def create_recognizer():
+    """Initialize the recognizer with optimized settings"""
+    r = sr.Recognizer()
+    r.pause_threshold = 0.3
+    r.energy_threshold = 4000
+    r.dynamic_energy_threshold = True
+    r.non_speaking_duration = 0.3
+    return r
+
+# Pre-connected keep-alive clients for recognition and translation
+recognizer_clients = speech_pool(size=3, timeout=8)
+translator_clients = translator_pool(size=3, timeout=5)
+
+def _remote_recognize(audio, language):
+    with recognizer_clients.client() as client:
+        return client.recognize(audio, language=language)
+
+def _remote_translate(text, src, dest):
+    with translator_clients.client() as client:
+        return client.translate(text, src=src, dest=dest)
 
-# Pre-initialize translator to avoid startup delay
-translator = Translator()
+# Hedge slow calls, retry with backoff and fail over to local wav2vec2.
+# Built during warm-up because the policy needs speech_recognition.
+recognition_policy = None
+translation_policy = None
 
-def animate_listening():
-    global listening
-    while listening:
-        sys.stdout.write('\rListening...   ')
-        time.sleep(0.2)
-        sys.stdout.write('\rListening..  ')
-        time.sleep(0.2)
-        sys.stdout.write('\rListening. ')
-        time.sleep(0.2)
-        sys.stdout.write('\rListening   ')
-        time.sleep(0.2)
-    sys.stdout.write('\r             \r')
+# Source:target pairs (--pairs); with several sources the language of
+# each utterance is detected and remembered per speaker. Probes skip the
+# local wav2vec2 fallback (xlsr-53 transcribes whatever it hears,
+# ignoring the requested locale) so it can't bias detection.
+router = LanguageRouter(DEFAULT_PAIRS, recognize=_remote_recognize)
+LOCAL_SPEAKER = "local"
 
-def animate_processing():
-    global processing
-    chars = ['|', '/', '-', '\\']
-    i = 0
-    while processing:
-        sys.stdout.write(f'\rProcessing {chars[i]}')
-        i = (i + 1) % 4
-        time.sleep(0.1)
-    sys.stdout.write('\r             \r')
+def init_backends():
+    global recognition_policy, translation_policy
+    recognition_policy = RequestPolicy("Recognition", _remote_recognize,
+                                       fallback=Wav2Vec2Recognizer().recognize,
+                                       deadline=7.5, non_retryable=(sr.UnknownValueError,))
+    translation_policy = RequestPolicy("Translation", _remote_translate, deadline=4.5)
+
+# Console status line (or JSON events with --status-json), driven by
+# pipeline events rather than polled flags
+status = StatusRenderer()
 
 class CustomVoiceSpeaker:
     def __init__(self, model_path="voice_model/voice_model.pkl"):
@@ -74,6 +101,17 @@ class CustomVoiceSpeaker:
             if not self.samples:
                 raise ValueError("No voice samples found in the model")
             
+            # Candidates are fixed per model, so filter them once here
+            self.valid_samples = [s for s in self.samples if s.get("processed_file")]
+            self.samples_with_text = [s for s in self.valid_samples if s.get("transcription")]
+            
+            # Models built before the retrieval index get one built here
+            index = self.model.get("index")
+            if index is not None:
+                self.index = VoiceIndex(self.samples, index)
+            else:
+                self.index = VoiceIndex(self.samples_with_text)
+            
             self.initialized = True
             print(f"Custom voice model loaded with {len(self.samples)} samples")
             
@@ -82,31 +120,28 @@ class CustomVoiceSpeaker:
             print("Falling back to default TTS")
             self.initialized = False
     
-    def speak_text(self, text):
-        """Use custom voice samples to speak text"""
+    def speak_text(self, text, engine=None):
+        """Use custom voice samples to speak text (on engine, default the shared one)"""
         if not self.initialized:
             return False
             
         try:
-            # Find samples with processed files
-            valid_samples = [s for s in self.samples if s.get("processed_file")]
+            valid_samples = self.valid_samples
             
             if not valid_samples:
                 print("No processed voice samples available")
                 return False
             
-            # For simple implementation, choose a sample with similar length
-            # In a real system, we'd use phoneme matching or neural TTS
-            target_len = len(text)
-            
-            # Try to find samples with transcription
-            samples_with_text = [s for s in valid_samples if s.get("transcription")]
+            # Choose the sample whose words and length best match the text,
+            # preferring cleaner takes. In a real system, we'd use phoneme
+            # matching or neural TTS
+            best_sample = None
+            for sample, _ in self.index.query(text, k=5):
+                if sample.get("processed_file") and sample.get("transcription"):
+                    best_sample = sample
+                    break
             
-            if samples_with_text:
-                # Find best matching sample by text length
-                best_sample = min(samples_with_text, 
-                                  key=lambda s: abs(len(s.get("transcription", "")) - target_len))
-            else:
+            if best_sample is None:
                 # Just pick a random sample
                 import random
                 best_sample = random.choice(valid_samples)
@@ -115,8 +150,9 @@ class CustomVoiceSpeaker:
             processed_file = best_sample.get("processed_file")
             
             if os.path.exists(processed_file):
-                audio = AudioSegment.from_wav(processed_file)
-                play(audio)
+                engine = engine or playback.engine
+                job = engine.play_file(processed_file)
+                engine.wait_until_heard(job)
                 return True
             else:
                 print(f"Audio file not found: {processed_file}")
@@ -126,146 +162,183 @@ class CustomVoiceSpeaker:
             print(f"Error playing custom voice: {e}")
             return False
 
-# Initialize custom voice system
+# Custom voice system, loaded during warm-up
 custom_voice = None
-try:
-    if os.path.exists("voice_model/voice_model.pkl"):
-        custom_voice = CustomVoiceSpeaker()
-    else:
-        print("No custom voice model found. Using default TTS.")
-except Exception as e:
-    print(f"Error initializing custom voice: {e}")
 
-# Fallback TTS using Google TTS
-from gtts import gTTS
+def load_custom_voice():
+    global custom_voice
+    try:
+        if os.path.exists("voice_model/voice_model.pkl"):
+            custom_voice = CustomVoiceSpeaker()
+        else:
+            print("No custom voice model found. Using default TTS.")
+    except Exception as e:
+        print(f"Error initializing custom voice: {e}")
 
 # Pre-download and cache common responses
-tts_cache = {}
+tts_cache = PcmCache(max_entries=50, max_text_length=100)
+
+# Pre-translated, pre-synthesized phrases (build with: python phrasebook.py build)
+phrasebook = Phrasebook()
+
+def render_speech(text, lang='en'):
+    """(audio, rate) for text from the phrasebook, the PCM cache or gTTS"""
+    entry = phrasebook.lookup_speech(text, lang)
+    if entry:
+        return phrasebook.pcm(entry)
+    pcm = tts_cache.get(text, lang)
+    if pcm is not None:
+        return pcm, SYNTH_RATE
+    
+    # Use Google TTS as fallback
+    print("Using Google TTS fallback")
+    pcm = synthesize(text, lang, output="pcm")
+    
+    # Cache shorter phrases as decoded PCM
+    tts_cache.put(text, lang, pcm)
+    return pcm, SYNTH_RATE
+
+# Likely translations (seen in past turns, or a known first clause) are
+# synthesized on a spare worker while the translation request is in flight
+speculator = SpeculativeSynthesizer(
+    render_speech, lookup=lambda text, src, dest: (phrasebook.lookup(text, src, dest) or {}).get('translation'))
 
-def speak_text(text, lang='en'):
-    """Speak text using custom voice or fallback to standard TTS"""
-    global listening, mic_active
+def speak_text(text, lang='en', speech=None):
+    """Speak text using custom voice, speculative clips or standard TTS"""
+    global mic_active
     
     # Use semaphore to ensure only one speech at a time
     with speaking_lock:
+        job = None
         try:
             # Explicitly disable microphone while speaking
             mic_active = False
-            listening = False
+            status.set_state("speaking")
             
             # Try custom voice first
-            if custom_voice and custom_voice.speak_text(text):
+            # The custom voice only speaks English
+            if lang == 'en' and custom_voice and custom_voice.speak_text(text):
                 print("Spoke using custom voice")
+            elif speech:
+                # Speculatively synthesized clips; a text part is the rest of
+                # the sentence, synthesized while the clip before it plays
+                for part in speech:
+                    job = playback.engine.play(*(render_speech(part, lang) if isinstance(part, str) else part))
             else:
-                # Check cache first
-                if text in tts_cache:
-                    playsound(tts_cache[text])
-                    return
-
-                # Use Google TTS as fallback
-                print("Using Google TTS fallback")
-                tts = gTTS(text=text, lang=lang, slow=False)
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-                    temp_filename = fp.name
-                
-                tts.save(temp_filename)
-                playsound(temp_filename)
-                
-                # Cache shorter phrases
-                if len(text) < 100 and len(tts_cache) < 50:
-                    tts_cache[text] = temp_filename
-                else:
-                    os.remove(temp_filename)
+                # Phrasebook and cache first, then synthesis
+                job = playback.engine.play(*render_speech(text, lang))
         except Exception as e:
             print("TTS error:", e)
         finally:
-            # Wait for audio system to fully release
-            time.sleep(0.5)
+            # Keep the mic off until the last sample has actually been played
+            if job is not None:
+                playback.engine.wait_until_heard(job)
             mic_active = True  # Re-enable microphone
 
-def recognize_audio(audio):
+def recognize_audio(audio, locale="bn-BD", language="Bengali"):
     """Separated function for speech recognition"""
     try:
         # Use timeout to prevent hanging
-        print("Recognizing speech...", end="\r")
-        bengali_text = recognizer.recognize_google(audio, language="bn-BD", show_all=False)
-        print("                      ", end="\r")  # Clear the line
-        return bengali_text
+        with status.stage("recognize"):
+            return recognition_policy.execute(audio, locale)
     except sr.UnknownValueError:
-        print("No Bengali speech detected.", end="\r")
+        status.post("no_speech", language=language)
         return None
     except Exception as e:
         print(f"\rRecognition error: {str(e)}")
         return None
 
-def translate_text(bengali_text):
+def translate_text(source_text, src='bn', dest='en'):
     """Separated function for translation"""
     try:
-        translation = translator.translate(bengali_text, src='bn', dest='en')
-        return translation.text
+        with status.stage("translate"):
+            return translation_policy.execute(source_text, src, dest)
     except Exception as e:
         print(f"\rTranslation error: {str(e)}")
         return None
 
 def process_audio(audio):
-    global processing, mic_active
+    global mic_active
     try:
-        processing = True
+        status.set_state("processing")
         mic_active = False  # Disable microphone while processing
-        threading.Thread(target=animate_processing).start()
+        
+        # The first utterance may arrive before warm-up has finished
+        backends_ready.wait()
+        if recognition_policy is None:
+            print("\rSpeech backends are not available")
+            return
+        
+        # Pick the source language (from the speaker's prior or a quick
+        # look at the first fraction of a second), then recognize once
+        with status.stage("route"):
+            src, locale, dest = router.route(audio, LOCAL_SPEAKER)
         
         # Submit recognition task to thread pool
-        future_recognition = executor.submit(recognize_audio, audio)
-        bengali_text = future_recognition.result(timeout=8)
+        future_recognition = executor.submit(recognize_audio, audio, locale, language_name(src))
+        source_text = future_recognition.result(timeout=8)
         
-        if not bengali_text:
+        router.confirm(LOCAL_SPEAKER, src, source_text)
+        if not source_text:
             print("Speech not recognized. Please try again.")
-            processing = False
             mic_active = True  # Re-enable microphone
             return
             
         sys.stdout.write('\r\033[K')  # Clear current line
-        print(f"\rBengali: {bengali_text}")
+        print(f"\r{language_name(src)}: {source_text}")
+        status.post("transcript", lang=src, text=source_text)
         
-        # Submit translation task to thread pool
-        print("Translating...", end="\r")
-        future_translation = executor.submit(translate_text, bengali_text)
-        english_text = future_translation.result(timeout=5)
-        print("              ", end="\r")  # Clear the line
+        # Exact phrasebook matches skip translation and synthesis
+        entry = phrasebook.lookup(source_text, src, dest)
+        speculation = None
+        if entry:
+            translated_text = entry['translation']
+        else:
+            # Start synthesizing likely translations while the real one is fetched
+            if not (dest == 'en' and custom_voice):
+                speculation = speculator.speculate(source_text, src, dest)
+            # Submit translation task to thread pool
+            future_translation = executor.submit(translate_text, source_text, src, dest)
+            translated_text = future_translation.result(timeout=5)
         
-        if not english_text:
+        if not translated_text:
             print("\rTranslation failed")
-            processing = False
+            if speculation is not None:
+                speculation.cancel()
             mic_active = True  # Re-enable microphone
             return
             
-        print(f"English: {english_text}")
+        print(f"{language_name(dest)}: {translated_text}")
+        status.post("translation", lang=dest, text=translated_text)
         
-        # Pause mic and speak the response
-        print("Speaking response...", end="\r")
-        speaking_thread = executor.submit(speak_text, english_text, 'en')
-        speaking_thread.result()  # Wait for speaking to complete
-        print("                    ", end="\r")  # Clear the line
+        # Keep speculative audio only if it matches the final translation
+        speech = None
+        if not entry:
+            speech = speculator.finish(speculation, source_text, src, dest, translated_text)
+            if speculation is not None:
+                status.post("speculation", result="miss" if speech is None else "hit" if len(speech) == 1 else "prefix")
         
-        # Brief pause after speech to avoid cutting off playback
-        time.sleep(0.3)
+        # Pause mic and speak the response
+        with status.stage("speak"):
+            speaking_thread = executor.submit(speak_text, translated_text, dest, speech)
+            speaking_thread.result()  # Wait for speaking to complete
         
     except concurrent.futures.TimeoutError:
         print("\rOperation timed out. The network may be slow.")
     except Exception as e:
         print(f"\rError: {str(e)}")
     finally:
-        processing = False
+        status.set_state("idle")
         mic_active = True  # Re-enable microphone
 
 def audio_callback(recognizer, audio):
-    global listening, mic_active
-    listening = False
+    global mic_active
     if mic_active:  # Only process audio when microphone should be active
         executor.submit(process_audio, audio)
 
 def start_listening():
-    global listening, mic_active
+    global mic_active, recognizer
+    recognizer = create_recognizer()
     
     # Try to use device index for microphone to avoid system audio
     try:
@@ -277,7 +350,8 @@ def start_listening():
         
         # Let user select a microphone
         try:
-            mic_index = int(input("Enter the index of the microphone to use (default: 2 for MacBook Air Microphone): ") or "2")
+            with timed_stage("microphone prompt"):
+                mic_index = int(input("Enter the index of the microphone to use (default: 2 for MacBook Air Microphone): ") or "2")
             if mic_index < 0 or mic_index >= len(mic_list):
                 print(f"Invalid index. Using default microphone index 2.")
                 mic_index = 2
@@ -289,25 +363,25 @@ def start_listening():
         
         with sr.Microphone(device_index=mic_index) as source:
             print("Calibrating microphone...")
-            recognizer.adjust_for_ambient_noise(source, duration=1.0)
-            print("Ready! Speak in Bengali...")
+            with timed_stage("microphone calibration"):
+                recognizer.adjust_for_ambient_noise(source, duration=1.0)
+            ready_times['microphone'] = elapsed()
+            mic_ready.set()
+            print(f"Ready! Speak in {' or '.join(language_name(l) for l in router.sources)}...")
             
             while True:
                 try:
                     # Only listen when mic_active is True
                     if mic_active:
-                        listening = True
-                        threading.Thread(target=animate_listening).start()
+                        status.set_state("listening")
                         
                         audio = recognizer.listen(source, timeout=1, phrase_time_limit=4)
-                        listening = False
                         audio_callback(recognizer, audio)
                     else:
                         # When mic is not active, just wait a bit
                         time.sleep(0.1)
                     
                 except sr.WaitTimeoutError:
-                    listening = False
                     continue
                 except Exception as e:
                     print(f"Listening error: {str(e)}")
@@ -318,67 +392,81 @@ def start_listening():
         # Fallback to default microphone
         with sr.Microphone() as source:
             print("Calibrating fallback microphone...")
-            recognizer.adjust_for_ambient_noise(source, duration=1.0)
-            print("Ready! Speak in Bengali...")
+            with timed_stage("microphone calibration"):
+                recognizer.adjust_for_ambient_noise(source, duration=1.0)
+            ready_times['microphone'] = elapsed()
+            mic_ready.set()
+            print(f"Ready! Speak in {' or '.join(language_name(l) for l in router.sources)}...")
             
             while True:
                 try:
                     if mic_active:
-                        listening = True
-                        threading.Thread(target=animate_listening).start()
+                        status.set_state("listening")
                         audio = recognizer.listen(source, timeout=1, phrase_time_limit=4)
-                        listening = False
                         audio_callback(recognizer, audio)
                     else:
                         time.sleep(0.1)
                 except sr.WaitTimeoutError:
-                    listening = False
                     continue
                 except Exception as e:
                     print(f"Listening error: {str(e)}")
                     time.sleep(1)
 
 # Warm up components
-def warmup():
-    """Pre-initialize components to reduce first-run latency"""
-    print("Warming up components...")
-    # Force translator initialization
-    try:
-        translator.translate("hello", src='en', dest='bn')
-    except:
-        pass
+def warmup(pools=True):
+    """Pre-initialize components in the background to reduce first-run latency.
+
+    pools=False skips the shared client pools, for callers with their own.
+    """
+    def stage(name, func, *args):
+        with timed_stage(name):
+            func(*args)
     
-    # Precache some common responses
-    common_phrases = [
-        "I didn't understand that",
-        "Could you repeat that?",
-        "Thank you",
-        "How can I help you?"
-    ]
+    # Everything runs in parallel and alongside microphone calibration
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [
+            pool.submit(stage, "backend policies", init_backends),
+            pool.submit(stage, "custom voice model", load_custom_voice),
+            pool.submit(stage, "phrasebook", phrasebook.load),
+            pool.submit(stage, "turn history", speculator.history.load),
+        ]
+        if pools:
+            futures += [
+                pool.submit(stage, "recognizer pool", recognizer_clients.start),
+                pool.submit(stage, "translator pool", translator_clients.start),
+            ]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Warm-up step failed: {e}")
     
-    # Preload TTS for common phrases
-    for phrase in common_phrases:
-        try:
-            tts = gTTS(text=phrase, lang='en', slow=False)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-                temp_filename = fp.name
-            
-            tts.save(temp_filename)
-            tts_cache[phrase] = temp_filename
-        except:
-            pass
-            
-    print("System ready!")
-
-# Main execution
-if __name__ == "__main__":
-    # Run warmup in the main thread to ensure it completes
-    warmup()
+    ready_times['backends'] = elapsed()
+    backends_ready.set()
     
     if custom_voice and custom_voice.initialized:
         print("CUSTOM VOICE MODE ACTIVE")
     else:
         print("Using standard TTS (custom voice not available)")
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bengali to English voice translator")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print an import-time and startup stage breakdown once ready")
+    add_arguments(parser)
+    add_status_arguments(parser)
+    args = parser.parse_args()
+    router = LanguageRouter(args.pairs, recognize=_remote_recognize)
+    
+    # One status renderer for the session; SIGUSR1 dumps memory
+    status = status_from_args(args).start()
+    install_memory_signal()
+    
+    # Warm up in the background while the microphone is opened and calibrated
+    warmup_thread = threading.Thread(target=warmup)
+    warmup_thread.daemon = True
+    warmup_thread.start()
     
     print("Audio feedback prevention active - microphone will be disabled during playback")
     print("\nTroubleshooting tips:")
@@ -392,17 +480,37 @@ if __name__ == "__main__":
     listening_thread = threading.Thread(target=start_listening)
     listening_thread.daemon = True
     listening_thread.start()
-
+    
     try:
+        # Without the policies nothing can be recognized: say so now, not
+        # on the first utterance
+        backends_ready.wait()
+        if recognition_policy is None:
+            print("Speech backends failed to start; see the warm-up errors above")
+            sys.exit(1)
+        
+        if args.profile_startup:
+            mic_ready.wait()
+            # Ready once both the microphone and the backends are. Time spent
+            # waiting for the user at the prompt is not startup cost; warm-up
+            # runs regardless of the prompt, so its time is taken as is.
+            ready_at = max(ready_times['microphone'] - stage_times.get("microphone prompt", 0),
+                           ready_times['backends'])
+            print_startup_profile(ready_at)
+        
         while True:
             time.sleep(0.1)
     except KeyboardInterrupt:
         print("\nExiting...")
-        # Clean up cached files
-        for filename in tts_cache.values():
-            try:
-                os.remove(filename)
-            except:
-                pass
+        phrasebook.close()
+        playback.engine.close()
+        if recognition_policy:
+            recognition_policy.shutdown()
+            translation_policy.shutdown()
+        router.shutdown()
+        speculator.shutdown()
+        status.stop()
+        recognizer_clients.close()
+        translator_clients.close()
         executor.shutdown(wait=False)
         sys.exit(0)
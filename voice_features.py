@@ -0,0 +1,127 @@
+import numpy as np
+import soundfile as sf
+from scipy.signal import find_peaks
+
+from audio_dsp import frame_rms
+
+FRAME_MS = 40            # analysis frame (long enough for a 60 Hz period)
+HOP_MS = 10
+F0_MIN = 60
+F0_MAX = 400
+EMBEDDING_BANDS = 24
+
+# Takes failing any of these are left out of the model
+MIN_RMS_DB = -50.0       # too quiet (normalization would only amplify noise)
+MIN_SNR_DB = 15.0        # too noisy
+MAX_CLIPPING = 0.001     # share of samples at full scale
+MIN_VOICED = 0.1         # share of frames with a pitch
+MIN_DURATION = 0.5       # seconds
+
+
+def _frames(audio, frame_length, hop):
+    """Overlapping frames as a strided (n_frames, frame_length) view"""
+    if len(audio) < frame_length:
+        audio = np.pad(audio, (0, frame_length - len(audio)))
+    n_frames = 1 + (len(audio) - frame_length) // hop
+    return np.lib.stride_tricks.as_strided(
+        audio, shape=(n_frames, frame_length),
+        strides=(audio.strides[0] * hop, audio.strides[0]), writeable=False)
+
+
+def pitch_track(frames, rate, energy, f0_min=F0_MIN, f0_max=F0_MAX):
+    """Autocorrelation F0 for every frame at once; 0 where unvoiced"""
+    frame_length = frames.shape[1]
+    window = np.hanning(frame_length).astype(np.float32)
+    windowed = (frames - frames.mean(axis=1, keepdims=True)) * window
+    # Autocorrelation of all frames through one batched FFT
+    spectrum = np.fft.rfft(windowed, n=2 * frame_length, axis=1)
+    autocorr = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, axis=1)[:, :frame_length]
+
+    low = max(1, int(rate / f0_max))
+    high = min(frame_length - 1, int(rate / f0_min))
+    lags = np.argmax(autocorr[:, low:high], axis=1) + low
+    strength = autocorr[np.arange(len(lags)), lags] / (autocorr[:, 0] + 1e-10)
+
+    voiced = (strength > 0.3) & (energy > energy.max() * 0.05)
+    return np.where(voiced, rate / lags, 0.0)
+
+
+def band_embedding(audio, rate, bands=EMBEDDING_BANDS):
+    """Unit vector of mean log energies in log-spaced bands (a coarse timbre print)"""
+    spectrum = np.abs(np.fft.rfft(audio)) ** 2
+    freqs = np.fft.rfftfreq(len(audio), 1.0 / rate)
+    edges = np.geomspace(F0_MIN, rate / 2, bands + 1)
+    band_index = np.clip(np.searchsorted(edges, freqs) - 1, 0, bands - 1)
+    counts = np.bincount(band_index, minlength=bands)
+    energies = np.log1p(np.bincount(band_index, weights=spectrum, minlength=bands) / np.maximum(counts, 1))
+    norm = np.linalg.norm(energies)
+    return energies / norm if norm else energies
+
+
+def analyze(audio, rate, transcription=None):
+    """Loudness, noise, clipping, pitch, pace and timbre of one take"""
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    audio = audio.astype(np.float32, copy=False)
+    duration = len(audio) / rate
+
+    frame_length = int(rate * FRAME_MS / 1000)
+    hop = int(rate * HOP_MS / 1000)
+    frames = _frames(audio, frame_length, hop)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+
+    # Noise floor from the quietest frames, speech level from the loudest
+    noise, speech = np.percentile(energy, [10, 95])
+    f0 = pitch_track(frames, rate, energy)
+    voiced_f0 = f0[f0 > 0]
+
+    # Syllable nuclei: loudness peaks at least 100 ms apart
+    envelope = np.convolve(frame_rms(audio, hop), np.ones(8) / 8, mode="same")
+    peaks, _ = find_peaks(envelope, height=speech * 0.3, distance=100 // HOP_MS,
+                          prominence=speech * 0.1)
+
+    rms = float(np.sqrt(np.mean(audio ** 2)))
+    features = {
+        "duration": round(duration, 3),
+        "rms_db": round(float(20 * np.log10(rms + 1e-10)), 2),
+        "snr_db": round(float(20 * np.log10((speech + 1e-10) / (noise + 1e-10))), 2),
+        "clipping_ratio": float(np.mean(np.abs(audio) >= 0.999)),
+        "voiced_ratio": round(float(np.mean(f0 > 0)), 3),
+        "f0_mean": round(float(voiced_f0.mean()), 1) if len(voiced_f0) else 0.0,
+        "f0_std": round(float(voiced_f0.std()), 1) if len(voiced_f0) else 0.0,
+        "f0_median": round(float(np.median(voiced_f0)), 1) if len(voiced_f0) else 0.0,
+        "syllables_per_second": round(len(peaks) / max(duration, 1e-3), 2),
+        "embedding": [round(float(x), 5) for x in band_embedding(audio, rate)],
+    }
+    if transcription:
+        features["words_per_second"] = round(len(transcription.split()) / max(duration, 1e-3), 2)
+    return features
+
+
+def analyze_file(path, transcription=None):
+    audio, rate = sf.read(path, dtype="float32")
+    return analyze(audio, rate, transcription)
+
+
+def rejection_reasons(features):
+    """Why a take is unusable; an empty list means it is accepted"""
+    reasons = []
+    if features["duration"] < MIN_DURATION:
+        reasons.append("too short")
+    if features["rms_db"] < MIN_RMS_DB:
+        reasons.append("too quiet")
+    if features["snr_db"] < MIN_SNR_DB:
+        reasons.append("too noisy")
+    if features["clipping_ratio"] > MAX_CLIPPING:
+        reasons.append("clipped")
+    if features["voiced_ratio"] < MIN_VOICED:
+        reasons.append("no voiced speech")
+    return reasons
+
+
+def quality_score(features):
+    """0..1 summary used to rank accepted takes (SNR first, then level and clipping)"""
+    snr = np.clip((features["snr_db"] - MIN_SNR_DB) / 25.0, 0, 1)
+    level = np.clip((features["rms_db"] - MIN_RMS_DB) / 25.0, 0, 1)
+    clipping = 1 - np.clip(features["clipping_ratio"] / MAX_CLIPPING, 0, 1)
+    return round(float(0.6 * snr + 0.25 * level + 0.15 * clipping), 3)
@@ -0,0 +1,160 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from phrasebook import normalize_text
+
+MAX_POSTINGS = 512       # best-prior samples kept per term
+QUERY_TRIGRAMS = 6       # rarest character trigrams used per query
+LENGTH_NEIGHBOURS = 16   # samples of similar length always considered
+CACHE_SIZE = 1024
+
+
+def text_terms(text):
+    """Word and character-trigram terms of normalized text"""
+    normalized = normalize_text(text or "")
+    words = {"w:" + w for w in normalized.split()}
+    padded = f" {normalized} "
+    trigrams = {"c:" + padded[i:i + 3] for i in range(len(padded) - 2)}
+    return words, trigrams
+
+
+def build_index(samples):
+    """Precompute the retrieval index for a list of model samples.
+
+    Returns plain arrays and dicts so it pickles with the model. Postings
+    are stored as one int32 array with per-term slices, each ordered by
+    sample prior (quality and typicality) and capped at MAX_POSTINGS.
+    """
+    n = len(samples)
+    lengths = np.array([len(normalize_text(s.get("transcription") or "")) for s in samples], dtype=np.int32)
+    quality = np.array([s.get("quality", 0.5) for s in samples], dtype=np.float32)
+
+    # Typicality: how close each take's timbre is to the speaker's average
+    typicality = np.full(n, 0.5, dtype=np.float32)
+    embedded = [i for i, s in enumerate(samples) if s.get("features", {}).get("embedding")]
+    if embedded:
+        embeddings = np.array([samples[i]["features"]["embedding"] for i in embedded], dtype=np.float32)
+        centroid = embeddings.mean(axis=0)
+        centroid /= np.linalg.norm(centroid) or 1.0
+        typicality[embedded] = embeddings @ centroid
+    prior = 0.7 * quality + 0.3 * typicality
+
+    # Exact transcriptions, best take first, so a verbatim match is never
+    # lost to posting-list truncation
+    exact = {}
+    for i in np.argsort(-prior, kind="stable"):
+        text = normalize_text(samples[i].get("transcription") or "")
+        if text:
+            exact.setdefault(text, int(i))
+
+    postings = {}
+    for i, sample in enumerate(samples):
+        words, trigrams = text_terms(sample.get("transcription"))
+        for term in words | trigrams:
+            postings.setdefault(term, []).append(i)
+
+    # Binary tf-idf: each term weighs idf^2 in the dot product; words count double
+    idf = {term: math.log((n + 1) / (len(ids) + 0.5)) * (2.0 if term.startswith("w:") else 1.0)
+           for term, ids in postings.items()}
+    norms = np.zeros(n, dtype=np.float32)
+    for term, ids in postings.items():
+        norms[ids] += idf[term] ** 2
+    norms = np.sqrt(norms)
+
+    offsets = {}
+    flat = []
+    for term, ids in postings.items():
+        ids = sorted(ids, key=lambda i: -prior[i])[:MAX_POSTINGS]
+        offsets[term] = (len(flat), len(flat) + len(ids), len(postings[term]), idf[term])
+        flat.extend(ids)
+
+    by_length = np.argsort(lengths, kind="stable").astype(np.int32)
+    return {
+        "exact": exact,
+        "postings": np.array(flat, dtype=np.int32),
+        "offsets": offsets,
+        "norms": norms,
+        "prior": prior.astype(np.float32),
+        "lengths": lengths,
+        "by_length": by_length,
+        "sorted_lengths": lengths[by_length],
+    }
+
+
+class VoiceIndex:
+    """Top-k sample retrieval by text similarity, length and take quality.
+
+    Queries touch only the postings of the query's words and rarest
+    trigrams plus a few samples of similar length, so their cost does not
+    grow with the number of clips. Results are cached per normalized text.
+    """
+
+    def __init__(self, samples, index=None, cache_size=CACHE_SIZE):
+        self.samples = samples
+        self.index = index if index is not None else build_index(samples)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _candidates(self, text):
+        index = self.index
+        words, trigrams = text_terms(text)
+        # Every word, but only the rarest (most telling) trigrams
+        trigrams = sorted((t for t in trigrams if t in index["offsets"]), key=lambda t: index["offsets"][t][2])
+        ids, weights = [], []
+        for term in [w for w in words if w in index["offsets"]] + trigrams[:QUERY_TRIGRAMS]:
+            start, end, _, idf = index["offsets"][term]
+            ids.append(index["postings"][start:end])
+            weights.append(np.full(end - start, idf * idf, dtype=np.float32))
+        query_norm = math.sqrt(sum(index["offsets"][t][3] ** 2 for t in words | set(trigrams) if t in index["offsets"]))
+
+        # Samples of about the right length, found by binary search
+        target = len(normalize_text(text))
+        middle = int(np.searchsorted(index["sorted_lengths"], target))
+        near = index["by_length"][max(0, middle - LENGTH_NEIGHBOURS // 2):middle + LENGTH_NEIGHBOURS // 2]
+        ids.append(near)
+        weights.append(np.zeros(len(near), dtype=np.float32))
+
+        exact = index["exact"].get(normalize_text(text))
+        if exact is not None:
+            # Verbatim match: a full-similarity bonus on top of its term overlap
+            ids.append(np.array([exact], dtype=np.int32))
+            weights.append(np.array([query_norm * index["norms"][exact]], dtype=np.float32))
+
+        ids = np.concatenate(ids)
+        candidates, inverse = np.unique(ids, return_inverse=True)
+        overlap = np.bincount(inverse, weights=np.concatenate(weights))
+        similarity = overlap / (query_norm * index["norms"][candidates] + 1e-6)
+        return candidates, similarity, target
+
+    def query(self, text, k=5):
+        """Up to k (sample, score) pairs, best first"""
+        key = (normalize_text(text), k)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        candidates, similarity, target = self._candidates(text)
+        lengths = self.index["lengths"][candidates]
+        length_penalty = np.abs(lengths - target) / np.maximum(np.maximum(lengths, target), 1)
+        scores = similarity - 0.5 * length_penalty + 0.2 * self.index["prior"][candidates]
+
+        if len(scores) == 0:
+            return []
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        results = [(self.samples[candidates[i]], float(scores[i])) for i in top]
+
+        with self._lock:
+            self._cache[key] = results
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return results
+
+    def best(self, text):
+        results = self.query(text, k=1)
+        return results[0][0] if results else None